@@ -1,15 +1,40 @@
 from __future__ import annotations
 
 import os
+from contextlib import contextmanager
 from datetime import datetime
 
-from airflow import DAG
-from airflow.providers.docker.operators.docker import DockerOperator
-from docker.types import Mount
+from airflow.sdk import DAG, task
 
 RAW_DIR = os.environ.get("RAW_DIR", "/opt/airflow/data/raw")
 PROCESSED_DIR = os.environ.get("PROCESSED_DIR", "/opt/airflow/data/processed")
 PIPELINE_IMAGE = os.environ.get("PIPELINE_IMAGE", "pipeline_customers:latest")
+# Number of shards each raw source is split into
+SOURCE_SHARDS = int(os.environ.get("SOURCE_SHARDS", "1"))
+# "docker" runs each task in the pipeline image, "python" runs it in-process
+# so the DAG can be exercised locally with dag.test() without a Docker daemon
+PIPELINE_EXECUTOR = os.environ.get("PIPELINE_EXECUTOR", "docker")
+# Directory the pipeline runs from in "python" mode: it reads data/raw and
+# writes data/processed under it, whatever the working directory of the worker
+PIPELINE_DIR = os.environ.get("PIPELINE_DIR", os.path.dirname(os.path.dirname(RAW_DIR)))
+# Memory budget of each cleaning task, e.g. 512M, sources are cleaned in chunks when set
+MEMORY_BUDGET = os.environ.get("MEMORY_BUDGET")
+
+
+def pipeline_command(args: list[str]) -> list[str]:
+    return ["python", "-m", "src.pipeline", *args]
+
+
+@contextmanager
+def in_pipeline_dir():
+    """Run an in-process pipeline step from PIPELINE_DIR."""
+    previous = os.getcwd()
+    os.chdir(PIPELINE_DIR)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
 
 with DAG(
     dag_id="dataops_customers_pipeline",
@@ -19,16 +44,81 @@ with DAG(
     tags=["dataops", "docker"],
 ) as dag:
 
-    run_pipeline = DockerOperator(
-        task_id="run_pipeline_container",
-        image=PIPELINE_IMAGE,
-        api_version="auto",
-        auto_remove="success",
-        docker_url="unix://var/run/docker.sock",
-        network_mode="bridge",
-        mount_tmp_dir=False,
-        mounts=[
-            Mount(source="data-raw", target="/app/data/raw", type="volume"),
-            Mount(source="data-processed", target="/app/data/processed", type="volume"),
-        ],
-    )
+    @task
+    def discover_partitions(run_id: str | None = None) -> list[list[str]]:
+        """One set of pipeline arguments per raw file and shard.
+
+        The Airflow run id is passed along so a retried task resumes from
+        the checkpoints of its previous attempt.
+        """
+        # In "python" mode the sources are listed where the pipeline reads them
+        raw_dir = os.path.join(PIPELINE_DIR, "data", "raw") if PIPELINE_EXECUTOR == "python" else RAW_DIR
+        raw_files = sorted({
+            name.removesuffix(".gz").removesuffix(".zst") for name in os.listdir(raw_dir)
+            if name.startswith("customers_dirty") and name.endswith((".csv", ".csv.gz", ".csv.zst"))
+        })
+        extra_args = ["--memory-budget", MEMORY_BUDGET] if MEMORY_BUDGET else []
+        if run_id:
+            extra_args += ["--run-id", run_id]
+        return [
+            ["--source", name, "--shard", str(shard), "--shards", str(SOURCE_SHARDS), *extra_args]
+            for name in raw_files
+            for shard in range(SOURCE_SHARDS)
+        ]
+
+    partitions = discover_partitions()
+
+    if PIPELINE_EXECUTOR == "python":
+
+        @task(task_id="clean_source")
+        def clean_source(args: list[str]) -> None:
+            from src.pipeline import main
+
+            with in_pipeline_dir():
+                main(args)
+
+        @task(task_id="merge_and_check")
+        def merge_and_check(run_id: str | None = None) -> None:
+            from src.pipeline import main
+
+            with in_pipeline_dir():
+                main(["--merge", *(["--run-id", run_id] if run_id else [])])
+
+        clean_sources = clean_source.expand(args=partitions)
+        merge = merge_and_check()
+
+    else:
+        from airflow.providers.docker.operators.docker import DockerOperator
+        from docker.types import Mount
+
+        docker_kwargs = dict(
+            image=PIPELINE_IMAGE,
+            api_version="auto",
+            auto_remove="success",
+            docker_url="unix://var/run/docker.sock",
+            network_mode="bridge",
+            mount_tmp_dir=False,
+            mounts=[
+                Mount(source="data-raw", target="/app/data/raw", type="volume"),
+                Mount(source="data-processed", target="/app/data/processed", type="volume"),
+                # Run profiles, kept across runs to detect data drift
+                Mount(source="data-profiles", target="/app/data/profiles", type="volume"),
+            ],
+        )
+
+        clean_sources = DockerOperator.partial(
+            task_id="clean_source",
+            **docker_kwargs,
+        ).expand(command=partitions.map(pipeline_command))
+
+        merge = DockerOperator(
+            task_id="merge_and_check",
+            command=pipeline_command(["--merge", "--run-id", "{{ run_id }}"]),
+            **docker_kwargs,
+        )
+
+    clean_sources >> merge
+
+
+if __name__ == "__main__":
+    dag.test()
@@ -0,0 +1,93 @@
+""" Benchmark sorted-neighbourhood sparse clustering against the former dense scoring of whole blocks. """
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.sample_data import build_dataframe
+from src.entity_resolution import _BIGRAM_BUCKETS, _blocking_keys, _connected_components, _normalize_text, assign_duplicate_clusters
+
+# -----
+
+def dense_vectors(param_values: np.ndarray) -> np.ndarray:
+    """ Former dense L2-normalized hashed character bigram vectors, kept for comparison. """
+
+    width = max(max(map(len, param_values), default=0), 2)
+    codes = np.asarray(param_values, dtype=f"<U{width}").view(np.uint32).reshape(len(param_values), width)
+
+    present = (codes[:, :-1] != 0) & (codes[:, 1:] != 0)
+    buckets = (codes[:, :-1].astype(np.int64) * 31 + codes[:, 1:]) % _BIGRAM_BUCKETS
+    flat = (np.arange(len(param_values))[:, None] * _BIGRAM_BUCKETS + buckets)[present]
+
+    vectors = np.bincount(flat, minlength=len(param_values) * _BIGRAM_BUCKETS).astype(np.float32).reshape(len(param_values), _BIGRAM_BUCKETS)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+
+    return vectors
+
+# -----
+
+def dense_block_clusters(param_dataframe: pd.DataFrame, param_threshold: float = 0.75, param_max_block_size: int = 1000) -> pd.DataFrame:
+    """ Former clustering: every pair of rows of a block window scored with dense matrix products, kept for comparison. """
+
+    names = _normalize_text(param_dataframe["full_name"])
+    locals_ = _normalize_text(param_dataframe["email"]).str.split("@").str[0].fillna("")
+
+    keys = _blocking_keys(names.reset_index(drop=True), locals_.reset_index(drop=True), 4)
+    keys["email"] = locals_.to_numpy(dtype=object)[keys["row"].to_numpy()]
+    keys = keys.sort_values(["key", "email", "row"], kind="stable")
+    keys["block"] = keys["key"] + "#" + (keys.groupby("key", sort=False).cumcount() // param_max_block_size).astype(str)
+
+    name_values, local_values = names.to_numpy(dtype=str), locals_.to_numpy(dtype=str)
+    matches = [np.empty((0, 2), dtype=np.int64)]
+
+    for _, block_rows in keys.groupby("block", sort=False)["row"]:
+        rows = block_rows.to_numpy()
+        name_vectors, email_vectors = dense_vectors(name_values[rows]), dense_vectors(local_values[rows])
+        scores = (name_vectors @ name_vectors.T + email_vectors @ email_vectors.T) / 2
+        left, right = np.nonzero(np.triu(scores >= param_threshold - 1e-6, k=1))
+        matches.append(np.column_stack([rows[left], rows[right]]))
+
+    param_dataframe["cluster_id"] = pd.factorize(_connected_components(len(param_dataframe), np.concatenate(matches)))[0]
+
+    return param_dataframe
+
+# -----
+
+def main() -> None:
+    """ Print the timings and cluster counts of both clusterings. """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    dataframe = build_dataframe(args.rows)
+
+    print(f"{'clustering':<24}{'best s':>10}{'clusters':>12}")
+
+    for label, function in [
+        ("dense blocks", dense_block_clusters),
+        ("sorted neighbourhood", lambda frame: assign_duplicate_clusters(frame, param_workers=args.workers))
+    ]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            clusters = function(dataframe.copy())["cluster_id"]
+            timings.append(time.perf_counter() - start)
+
+        print(f"{label:<24}{min(timings):>10.2f}{clusters.nunique():>12}")
+
+    return None
+
+# -----
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,61 @@
+""" Benchmark write/read speed and ratio of the supported CSV compressions. """
+
+import os
+import sys
+import time
+import tempfile
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.sample_data import build_dataframe
+from src.compression import read_csv, write_csv
+
+# -----
+
+def main() -> None:
+    """ Print size, ratio and timings of each compression. """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    dataframe = build_dataframe(args.rows)
+
+    with tempfile.TemporaryDirectory() as directory:
+        plain_path = write_csv(dataframe, os.path.join(directory, "customers.csv"))
+        plain_size = os.path.getsize(plain_path)
+
+        print(f"{'format':<22}{'size MB':>10}{'ratio':>8}{'write s':>10}{'read s':>10}")
+
+        for index, (label, suffix, workers) in enumerate([
+            ("csv", "", 1),
+            ("gzip (1 thread)", ".gz", 1),
+            (f"gzip ({args.workers} threads)", ".gz", args.workers),
+            ("gzip (pandas)", ".gz", None),
+            ("zstd", ".zst", 1)
+        ]):
+            path = os.path.join(directory, f"customers{index}.csv{suffix}")
+
+            start = time.perf_counter()
+            if workers is None:
+                dataframe.to_csv(path, index=False, compression="gzip")
+            else:
+                write_csv(dataframe, path, param_workers=workers)
+            write_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            read_csv(path, param_workers=workers or 1)
+            read_time = time.perf_counter() - start
+
+            size = os.path.getsize(path)
+            print(f"{label:<22}{size / 1e6:>10.1f}{plain_size / size:>8.2f}{write_time:>10.2f}{read_time:>10.2f}")
+
+    return None
+
+# -----
+
+if __name__ == "__main__":
+
+    main()
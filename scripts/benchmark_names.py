@@ -0,0 +1,59 @@
+""" Benchmark the single-pass full name tokenizer against the former double split. """
+
+import os
+import sys
+import time
+import argparse
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.sample_data import sample_raw_customers
+from src.names import split_full_name
+
+# -----
+
+def double_split(param_full_name: pd.Series) -> pd.Series:
+    """ Former full name check: two independent splits, kept for comparison. """
+
+    first_name = param_full_name.str.split().str[0]
+    last_name = param_full_name.str.split().str[1]
+
+    return first_name.notna() & last_name.notna()
+
+# -----
+
+def main() -> None:
+    """ Print the timings of both tokenizers and check they keep the same rows. """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    full_name = sample_raw_customers(args.rows, param_columns=["full_name"])["full_name"].astype("str")
+    results = {}
+
+    print(f"{'tokenizer':<16}{'best s':>10}")
+
+    for label, function in [
+        ("double split", double_split),
+        ("single pass", lambda names: split_full_name(names)["last_name"].notna())
+    ]:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[label] = function(full_name)
+            timings.append(time.perf_counter() - start)
+
+        print(f"{label:<16}{min(timings):>10.2f}")
+
+    assert results["double split"].equals(results["single pass"])
+
+    return None
+
+# -----
+
+if __name__ == "__main__":
+
+    main()
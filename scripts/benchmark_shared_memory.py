@@ -0,0 +1,69 @@
+""" Benchmark handing a dataframe to another process by pickling it or through shared memory. """
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.sample_data import build_dataframe
+from src.clean_data import clean_customer_source
+from src.shared_frames import attach_dataframe, share_dataframe
+
+# -----
+
+def _receive(param_input: multiprocessing.Queue, param_output: multiprocessing.Queue) -> None:
+    """ Receive dataframes, pickled or as shared memory handles, and acknowledge them with their size. """
+
+    while (message := param_input.get()) is not None:
+        kind, payload = message
+        dataframe = payload if kind == "pickle" else attach_dataframe(payload)
+        param_output.put(len(dataframe))
+
+    return None
+
+# -----
+
+def main() -> None:
+    """ Print the time to hand the raw and cleaned dataframes over with each method. """
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    raw = build_dataframe(args.rows, ["customers_dirty.csv"])
+    frames = {"raw": raw, "cleaned": clean_customer_source(raw, "customers_dirty.csv", param_finalize=False)}
+
+    inputs, outputs = multiprocessing.Queue(), multiprocessing.Queue()
+    process = multiprocessing.Process(target=_receive, args=(inputs, outputs))
+    process.start()
+
+    print(f"{'frame':<10}{'method':<16}{'MB':>8}{'seconds':>10}{'MB/s':>10}")
+
+    for label, dataframe in frames.items():
+        size = dataframe.memory_usage(deep=True).sum() / 1e6
+
+        for method in ["pickle", "shared memory"]:
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                inputs.put(("pickle", dataframe) if method == "pickle" else ("shared", share_dataframe(dataframe)))
+                assert outputs.get() == len(dataframe)
+                timings.append(time.perf_counter() - start)
+
+            best = min(timings)
+            print(f"{label:<10}{method:<16}{size:>8.0f}{best:>10.2f}{size / best:>10.0f}")
+
+    inputs.put(None)
+    process.join()
+
+    return None
+
+# -----
+
+if __name__ == "__main__":
+
+    main()
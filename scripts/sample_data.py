@@ -0,0 +1,40 @@
+""" Build benchmark data by sampling the rows of the raw customer files. """
+
+import os
+import pandas as pd
+
+RAW_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "raw")
+
+# -----
+
+def sample_raw_customers(param_rows: int, param_file_names: list = None, param_columns: list = None) -> pd.DataFrame:
+    """
+    Sample rows of the raw customer files, with replacement and a fixed seed.
+
+    Args:
+        param_rows: Number of rows to sample
+        param_file_names: Raw file names to sample from, every raw CSV file when None
+        param_columns: Columns to read, every column when None
+
+    Returns:
+        pd.DataFrame: Sampled rows with a fresh index
+    """
+
+    file_names = param_file_names or [name for name in sorted(os.listdir(RAW_DIR)) if name.endswith(".csv")]
+    sample = pd.concat(
+        [pd.read_csv(os.path.join(RAW_DIR, name), usecols=param_columns) for name in file_names],
+        ignore_index=True
+    )
+
+    return sample.sample(param_rows, replace=True, random_state=0).reset_index(drop=True)
+
+# -----
+
+def build_dataframe(param_rows: int, param_file_names: list = None) -> pd.DataFrame:
+    """ Build a benchmark customers dataframe with unique customer ids and emails from the raw files. """
+
+    dataframe = sample_raw_customers(param_rows, param_file_names)
+    dataframe["customer_id"] = range(len(dataframe))
+    dataframe["email"] = dataframe["customer_id"].astype(str) + "." + dataframe["email"].astype(str)
+
+    return dataframe
@@ -0,0 +1,162 @@
+""" Durable checkpoints letting an interrupted pipeline run resume from its last completed unit. """
+
+import os
+import json
+import shutil
+import pickle
+from src.compression import atomic_output_path, resolve_path
+
+CHECKPOINT_DIR_NAME = ".checkpoints"
+MANIFEST_NAME = "manifest.json"
+
+# -----
+
+def raw_file_fingerprint(param_file_name: str) -> list:
+    """ Return the size and modification time of a raw file, to detect a changed input between attempts. """
+
+    stat = os.stat(resolve_path(os.path.join(os.getcwd(), "data", "raw", param_file_name)))
+
+    return [param_file_name, stat.st_size, stat.st_mtime_ns]
+
+# -----
+
+def safe_file_name(param_name: str) -> str:
+    """ Return a name usable as a file name, e.g. for Airflow run ids containing colons. """
+
+    return "".join(character if character.isalnum() or character in "-_." else "_" for character in str(param_name))
+
+# -----
+
+class RunCheckpoint:
+    """
+    Completed units of one scope of a pipeline run, e.g. the chunks of a
+    source or the stages of a full run, persisted under
+    data/processed/.checkpoints/<run id>/<scope>.
+    Each unit may carry a result pickled next to the manifest. The manifest
+    and the results are replaced atomically, so a unit is either recorded
+    with its complete result or not recorded at all. A checkpoint created
+    with another fingerprint (changed inputs or parameters) is discarded.
+    """
+
+    def __init__(self, param_run_id: str, param_scope: str, param_fingerprint: object = None) -> None:
+        """
+        Open the checkpoint of a run scope, starting over when its fingerprint changed.
+
+        Args:
+            param_run_id: Identifier shared by the attempts of a run, e.g. the Airflow run id
+            param_scope: Part of the run the checkpoint covers, e.g. customers_cleaned2-0
+            param_fingerprint: JSON-serializable description of the inputs and parameters
+        """
+
+        self.directory = os.path.join(
+            os.getcwd(),
+            "data",
+            "processed",
+            CHECKPOINT_DIR_NAME,
+            safe_file_name(param_run_id),
+            safe_file_name(param_scope)
+        )
+        self.fingerprint = json.loads(json.dumps(param_fingerprint))
+        self.units = {}
+
+        manifest_path = os.path.join(self.directory, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as file:
+                manifest = json.load(file)
+
+            if manifest.get("fingerprint") == self.fingerprint:
+                self.units = manifest["units"]
+            else:
+                shutil.rmtree(self.directory)
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        return None
+
+    # -----
+
+    def completed(self, param_unit: str) -> bool:
+        """ Check whether a unit was completed by a previous attempt. """
+
+        return param_unit in self.units
+
+    # -----
+
+    def info(self, param_unit: str) -> dict:
+        """ Return the metadata recorded with a completed unit. """
+
+        return self.units[param_unit]["info"]
+
+    # -----
+
+    def load(self, param_unit: str) -> object:
+        """ Return the result pickled with a completed unit, None when it was recorded alone. """
+
+        if self.units[param_unit]["file"] is None:
+            return None
+
+        with open(os.path.join(self.directory, self.units[param_unit]["file"]), "rb") as file:
+            return pickle.load(file)
+
+    # -----
+
+    def save(self, param_unit: str, param_result: object = None, param_info: dict = None) -> None:
+        """
+        Record a unit as completed, with its result and metadata.
+
+        Args:
+            param_unit: Name of the unit, e.g. chunk-000003
+            param_result: Result to pickle, None to record the unit alone
+            param_info: JSON-serializable metadata, returned by info
+        """
+
+        entry = {"file": None, "info": param_info or {}}
+
+        if param_result is not None:
+            entry["file"] = f"{safe_file_name(param_unit)}.pkl"
+            with atomic_output_path(os.path.join(self.directory, entry["file"])) as temporary_path, open(temporary_path, "wb") as file:
+                pickle.dump(param_result, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self.units[param_unit] = entry
+        self._write_manifest()
+
+        return None
+
+    # -----
+
+    def discard(self, param_units: list) -> None:
+        """ Forget units and delete their results, once a later unit superseded them. """
+
+        entries = [self.units.pop(unit) for unit in param_units if unit in self.units]
+        self._write_manifest()
+
+        for entry in entries:
+            if entry["file"]:
+                os.remove(os.path.join(self.directory, entry["file"]))
+
+        return None
+
+    # -----
+
+    def clear(self) -> None:
+        """ Delete the checkpoint once the run scope completed, and the run directory when empty. """
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.units = {}
+
+        run_dir = os.path.dirname(self.directory)
+        for directory in [run_dir, os.path.dirname(run_dir)]:
+            if os.path.isdir(directory) and not os.listdir(directory):
+                os.rmdir(directory)
+
+        return None
+
+    # -----
+
+    def _write_manifest(self) -> None:
+        """ Atomically replace the manifest with the completed units. """
+
+        with atomic_output_path(os.path.join(self.directory, MANIFEST_NAME)) as temporary_path, open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump({"fingerprint": self.fingerprint, "units": self.units}, file)
+
+        return None
@@ -1,108 +1,201 @@
 """ Module to clean and normalize customer data across multiple dataframes. """
 
 import os
-import pycountry
+import json
+import shutil
+import numpy as np
 import pandas as pd
+from src.compression import COMPRESSION_SUFFIXES, atomic_output_path, strip_compression_suffix, write_csv
+from src.entity_resolution import assign_duplicate_clusters
+from src.lookup_index import INDEX_SUFFIX, refresh_lookup_indexes
+from src.names import email_local_part, split_full_name
+from src.profiling import load_parts_profile, merge_profiles, profile_output
+from src.validation import VALID_COUNTRY_CODES
+
+# Non-ISO country codes used by every source, mapped to their ISO 3166-1 alpha-2 code
+COUNTRY_CODE_ALIASES = {"UK": "GB"}
+
+# Suffix of the signup date counts saved next to a cleaned part
+PART_DATE_COUNTS_SUFFIX = ".dates.json"
+
+# Column of the cleaned parts holding the position of each row in its raw source
+PART_ROW_COLUMN = "source_row"
+
+# -----
+
+def _record_repairs(param_dataframe: pd.DataFrame, param_rule: str, param_mask: pd.Series) -> None:
+    """ Add the number of rows a cleaning rule repaired or dropped to the repair counts in attrs. """
+
+    repairs = param_dataframe.attrs.setdefault("repairs", {})
+    repairs[param_rule] = repairs.get(param_rule, 0) + int(param_mask.sum())
+
+    return None
 
 # -----
 
 def _fix_age(param_dataframe: pd.DataFrame, param_invalid_values: list = None) -> pd.DataFrame:
     """ Fix age column: replace invalid values and convert to int. """
 
+    mask_missing = param_dataframe["age"].isna()
+    _record_repairs(param_dataframe, "age_missing", mask_missing)
+
     if param_invalid_values:
-        for value in param_invalid_values:
-            param_dataframe["age"] = param_dataframe["age"].replace(value, pd.NA)
+        mask_invalid = param_dataframe["age"].isin(param_invalid_values)
+        _record_repairs(param_dataframe, "age_invalid", mask_invalid)
+        if mask_invalid.any():
+            param_dataframe["age"] = param_dataframe["age"].mask(mask_invalid)
+            mask_missing |= mask_invalid
 
     param_dataframe["age"] = param_dataframe["age"].fillna(0).astype(int)
-    param_dataframe["age"] = param_dataframe["age"].apply(lambda age: age if 16 <= age <= 99 else 16)
+
+    mask_out_of_range = ~param_dataframe["age"].between(16, 99)
+    _record_repairs(param_dataframe, "age_out_of_range", mask_out_of_range & ~mask_missing)
+    param_dataframe.loc[mask_out_of_range, "age"] = 16
 
     return param_dataframe
 
 # -----
 
-def _fix_signup_date(param_dataframe: pd.DataFrame, param_replacements: dict = None) -> pd.DataFrame:
-    """ Fix signup_date column: apply specific replacements and convert to datetime. """
+def _fix_signup_date(param_dataframe: pd.DataFrame, param_replacements: dict = None, param_fill_missing: bool = True) -> pd.DataFrame:
+    """
+    Fix signup_date column: apply specific replacements and convert to datetime.
+    ISO dates are parsed in one vectorized pass; replacements and generic
+    parsing only run on the values that failed to parse or have a replacement.
+    Missing dates are filled with the median date, floored to the day like
+    every other signup date, unless param_fill_missing is False.
+    """
+
+    replacements = param_replacements or {"not_a_date": pd.NaT}
 
-    if param_replacements:
-        for old, new in param_replacements.items():
-            param_dataframe["signup_date"] = param_dataframe["signup_date"].replace(old, new)
-    else:
-        param_dataframe["signup_date"] = param_dataframe["signup_date"].replace("not_a_date", pd.NaT)
+    signup_date = param_dataframe["signup_date"]
+    parsed_date = pd.to_datetime(signup_date, format="%Y-%m-%d", errors="coerce").astype("datetime64[ns]")
 
-    param_dataframe["signup_date"] = param_dataframe["signup_date"].astype("datetime64[ns]")
+    mask_dirty = (parsed_date.isna() & signup_date.notna()) | signup_date.isin(list(replacements))
+    if mask_dirty.any():
+        dirty_date = signup_date[mask_dirty].astype(object).replace(replacements)
+        parsed_date[mask_dirty] = dirty_date.astype("datetime64[ns]")
 
-    median_date = param_dataframe["signup_date"].median()
-    param_dataframe["signup_date"] = param_dataframe["signup_date"].fillna(median_date)
+    _record_repairs(param_dataframe, "signup_date_replaced", mask_dirty & parsed_date.notna())
+    _record_repairs(param_dataframe, "signup_date_missing", parsed_date.isna())
+
+    if param_fill_missing:
+        parsed_date = parsed_date.fillna(parsed_date.median().floor("D"))
+
+    param_dataframe["signup_date"] = parsed_date
 
     return param_dataframe
 
 # -----
 
-def _fix_email(param_dataframe: pd.DataFrame, param_specific_fix: str = None) -> pd.DataFrame:
-    """ Fix email column: add missing @ signs. """
+def date_count_items(param_date_counts: pd.Series) -> list:
+    """ Return signup date counts indexed by date as [nanoseconds since epoch, count] pairs. """
+
+    values = param_date_counts.index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+    return [[value, count] for value, count in zip(values.tolist(), param_date_counts.to_numpy().tolist())]
+
+# -----
+
+def median_of_date_counts(param_items: list) -> pd.Timestamp:
+    """
+    Return the median of counted signup dates, as pandas computes it over the
+    dates themselves and floored to the day, or NaT without dates.
+
+    Args:
+        param_items: [nanoseconds since epoch, count] pairs, a date may appear in several pairs
+
+    Returns:
+        pd.Timestamp: Median date
+    """
+
+    if not param_items:
+        return pd.NaT
+
+    items = np.array(param_items, dtype=np.int64).reshape(-1, 2)
+    values, inverse = np.unique(items[:, 0], return_inverse=True)
+    cumulative = np.cumsum(np.bincount(inverse, weights=items[:, 1]).astype(np.int64))
+    total = cumulative[-1]
+
+    lower = values[np.searchsorted(cumulative, (total + 1) // 2)]
+    upper = values[np.searchsorted(cumulative, total // 2 + 1)]
+
+    return pd.Timestamp(lower + (upper - lower) // 2).floor("D")
+
+# -----
+
+def _fix_email(param_dataframe: pd.DataFrame, param_specific_fix: str = None, param_names: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Fix email column: add missing @ signs, only rewriting the emails that need it.
+    With the format_name fix, truncated local parts are rebuilt from the
+    tokenized full names (param_names, tokenized here when None).
+    """
+
+    email = param_dataframe["email"]
+
+    if param_specific_fix == "missing_domain":
+        # Dataframe 3 specific
+        mask_dirty = ~email.str.contains(".com", regex=False, na=True)
+        _record_repairs(param_dataframe, "email_missing_domain", mask_dirty)
+        param_dataframe.loc[mask_dirty, "email"] = email[mask_dirty].str.replace("@example", "@example.com", regex=False)
+
+        return param_dataframe
+
+    # Dataframes 1 and 2: add the missing @
+    mask_dirty = ~email.str.contains("@", regex=False, na=True)
+    _record_repairs(param_dataframe, "email_missing_at", mask_dirty)
+    param_dataframe.loc[mask_dirty, "email"] = email[mask_dirty].str.replace("example.com", "@example.com", regex=False)
 
     if param_specific_fix == "format_name":
         # Dataframe 2 specific: format with first.last@domain
-        param_dataframe["email"] = param_dataframe["email"].apply(
-            lambda check: check if "@" in check else check.replace("example.com", "@example.com")
-        )
-
-        prenom = param_dataframe["full_name"].str.split().str[0]
-        nom = param_dataframe["full_name"].str.split().str[1]
-        domain = param_dataframe["email"].str.split("@").str[1]
-
-        mask_email = param_dataframe["email"].str.contains(r"\.[a-zA-Z]@")
-        param_dataframe.loc[mask_email, "email"] = (
-            prenom[mask_email].str.lower()
-            + "."
-            + nom[mask_email].str.lower()
-            + "@"
-            + domain
-        )
-
-        param_dataframe.drop(columns=["prenom", "nom"] if "prenom" in param_dataframe.columns else [], inplace=True)
-
-    elif param_specific_fix == "missing_domain":
-        # Dataframe 3 specific
-        param_dataframe["email"] = param_dataframe["email"].apply(
-            lambda check: check if ".com" in check else check.replace("@example", "@example.com")
-        )
+        mask_email = param_dataframe["email"].str.contains(r"\.[a-zA-Z]@", na=False)
+
+        if mask_email.any():
+            names = split_full_name(param_dataframe["full_name"]) if param_names is None else param_names
+            mask_email &= names["last_name"].notna().to_numpy()
+            _record_repairs(param_dataframe, "email_rebuilt_from_name", mask_email)
+
+            local_part = email_local_part(names[mask_email.to_numpy()])
+            domain = param_dataframe.loc[mask_email, "email"].str.split("@").str[1]
 
-    else:
-        # Dataframe 1 default
-        param_dataframe["email"] = param_dataframe["email"].apply(
-            lambda check: check if "@" in check else check.replace("example.com", "@example.com")
-        )
+            param_dataframe.loc[mask_email, "email"] = (local_part + "@" + domain).to_numpy()
 
     return param_dataframe
 
 # -----
 
 def _fix_country(param_dataframe: pd.DataFrame, param_specific_mappings: dict = None) -> pd.DataFrame:
-    """ Fix country column: standardize format and validate country codes. """
-
-    valid_country_codes = {country.alpha_2 for country in pycountry.countries}
+    """ Fix country column: standardize format, map non-ISO aliases and validate country codes. """
 
     if param_specific_mappings:
-        for old, new in param_specific_mappings.items():
-            if new.upper() not in valid_country_codes:
+        for new in param_specific_mappings.values():
+            if new.upper() not in VALID_COUNTRY_CODES:
                 raise ValueError(f"Invalid country code in mapping: '{new}'.")
 
-            param_dataframe["country"] = param_dataframe["country"].replace(old, new)
+        mask_mapped = param_dataframe["country"].isin(list(param_specific_mappings))
+        _record_repairs(param_dataframe, "country_mapped", mask_mapped)
+        if mask_mapped.any():
+            param_dataframe.loc[mask_mapped, "country"] = param_dataframe.loc[mask_mapped, "country"].map(param_specific_mappings)
+
+    country = param_dataframe["country"].str.upper()
+    _record_repairs(param_dataframe, "country_uppercased", country.ne(param_dataframe["country"]) & country.notna())
 
-    param_dataframe["country"] = param_dataframe["country"].str.upper()
+    mask_alias = country.isin(list(COUNTRY_CODE_ALIASES))
+    _record_repairs(param_dataframe, "country_alias_mapped", mask_alias)
+    param_dataframe["country"] = country.replace(COUNTRY_CODE_ALIASES)
 
     return param_dataframe
 
 # -----
 
 def _fix_purchase_amount(param_dataframe: pd.DataFrame) -> pd.DataFrame:
-    """ Ensure purchase amounts are non-negative. """
+    """ Ensure purchase amounts are non-negative, missing amounts becoming 0. """
 
     param_dataframe["last_purchase_amount"] = param_dataframe["last_purchase_amount"].astype(float)
-    param_dataframe["last_purchase_amount"] = param_dataframe["last_purchase_amount"].apply(
-        lambda price: price if price >= 0.0 else 0.0
-    )
+
+    mask_dirty = ~(param_dataframe["last_purchase_amount"] >= 0.0)
+    _record_repairs(param_dataframe, "last_purchase_amount_missing", param_dataframe["last_purchase_amount"].isna())
+    _record_repairs(param_dataframe, "last_purchase_amount_negative", param_dataframe["last_purchase_amount"] < 0.0)
+    param_dataframe.loc[mask_dirty, "last_purchase_amount"] = 0.0
 
     return param_dataframe
 
@@ -111,12 +204,105 @@ def _fix_purchase_amount(param_dataframe: pd.DataFrame) -> pd.DataFrame:
 def _drop_duplicate_emails(param_dataframe: pd.DataFrame) -> pd.DataFrame:
     """ Drop duplicate email entries, keeping the first occurrence. """
 
-    param_dataframe.drop_duplicates(subset=["email"], keep="first", inplace=True)
+    mask_duplicate = param_dataframe.duplicated(subset=["email"], keep="first")
+    _record_repairs(param_dataframe, "email_duplicate_dropped", mask_duplicate)
+
+    if mask_duplicate.any():
+        param_dataframe = param_dataframe[~mask_duplicate.to_numpy()]
 
     return param_dataframe
 
 # -----
 
+# Cleaning rules of each raw source, keyed by raw file name
+SOURCE_CLEANING_RULES = {
+    "customers_dirty.csv": {},
+    "customers_dirty2.csv": {
+        "signup_date_replacements": {"invalid_date": pd.NaT, "2025-02-29": "2025-02-28"},
+        "email_fix": "format_name",
+        "country_mappings": {"France": "FR"}
+    },
+    "customers_dirty3.csv": {
+        "age_invalid_values": ["abc"],
+        "signup_date_replacements": {
+            "not_a_date": pd.NaT,
+            "2025-13-01": "2025-12-01",
+            "2024-02-29": "2024-02-28",
+            "2025-02-30": "2025-02-28"
+        },
+        "email_fix": "missing_domain",
+        "require_full_name": True,
+        "country_mappings": {"France": "FR", "FRA": "FR", "USA": "US"},
+        "loyalty_tier_replacements": {"UNKNOWN": "BRONZE"}
+    }
+}
+
+# -----
+
+def clean_customer_source(param_dataframe: pd.DataFrame, param_file_name: str, param_finalize: bool = True, param_fill_dates: bool = True) -> pd.DataFrame:
+    """
+    Clean and normalize the customer data of a single raw source.
+    Sources without specific rules in SOURCE_CLEANING_RULES get the default cleaning.
+    With param_finalize False, the steps needing the whole source (median date
+    filling and email de-duplication) are left to the caller,
+    which is how chunks of a source are cleaned. With param_fill_dates False,
+    only the median date filling is left to the caller, which is how shards
+    of a source are cleaned. In both cases the signup date counts the median
+    is computed from are stored in attrs.
+
+    Args:
+        param_dataframe: Raw customers dataframe
+        param_file_name: Raw file name the dataframe comes from
+        param_finalize: Whether to run the whole-source steps
+        param_fill_dates: Whether to fill missing signup dates with the median date
+
+    Returns:
+        pd.DataFrame: Cleaned dataframe with its deletion count and per-rule repair counts in attrs
+    """
+
+    rules = SOURCE_CLEANING_RULES.get(param_file_name, {})
+    original_count = len(param_dataframe)
+
+    dataframe = param_dataframe.copy()
+    dataframe.attrs["repairs"] = {}
+    dataframe = _fix_age(dataframe, param_invalid_values=rules.get("age_invalid_values"))
+    fill_dates = param_finalize and param_fill_dates
+    dataframe = _fix_signup_date(dataframe, rules.get("signup_date_replacements"), param_fill_missing=fill_dates)
+
+    if not fill_dates:
+        # The median date is taken over every row of the source, before any row is dropped
+        signup_date_counts = dataframe["signup_date"].value_counts(sort=False)
+
+    # Full names are tokenized once for the email repair and the full name check
+    names = None
+    if rules.get("require_full_name") or rules.get("email_fix") == "format_name":
+        names = split_full_name(dataframe["full_name"])
+
+    dataframe = _fix_email(dataframe, param_specific_fix=rules.get("email_fix"), param_names=names)
+
+    if rules.get("require_full_name"):
+        _record_repairs(dataframe, "full_name_incomplete_dropped", names["last_name"].isna())
+        dataframe = dataframe[names["last_name"].notna().to_numpy()]
+
+    dataframe = _fix_country(dataframe, rules.get("country_mappings"))
+    dataframe = _fix_purchase_amount(dataframe)
+
+    if rules.get("loyalty_tier_replacements"):
+        _record_repairs(dataframe, "loyalty_tier_replaced", dataframe["loyalty_tier"].isin(list(rules["loyalty_tier_replacements"])))
+        dataframe["loyalty_tier"] = dataframe["loyalty_tier"].replace(rules["loyalty_tier_replacements"])
+
+    if param_finalize:
+        dataframe = _drop_duplicate_emails(dataframe)
+
+    # Store deletion count in dataframe attributes
+    dataframe.attrs["rows_deleted"] = original_count - len(dataframe)
+    if not fill_dates:
+        dataframe.attrs["signup_date_counts"] = signup_date_counts
+
+    return dataframe
+
+# -----
+
 def clean_customers_data(param_dataframe1: pd.DataFrame, param_dataframe2: pd.DataFrame, param_dataframe3: pd.DataFrame) -> tuple:
     """
     Clean and normalize customer data across three dataframes.
@@ -138,102 +324,272 @@ def clean_customers_data(param_dataframe1: pd.DataFrame, param_dataframe2: pd.Da
         tuple: Three cleaned dataframes with deletion counts
     """
 
-    # Store original row counts
-    original_count1 = len(param_dataframe1)
-    original_count2 = len(param_dataframe2)
-    original_count3 = len(param_dataframe3)
-
-    # Clean Dataframe 1
-    df1 = param_dataframe1.copy()
-    df1 = _fix_age(df1)
-    df1 = _fix_signup_date(df1)
-    df1 = _fix_email(df1)
-    df1 = _fix_country(df1)
-    df1 = _fix_purchase_amount(df1)
-    df1 = _drop_duplicate_emails(df1)
-
-    # Clean Dataframe 2
-    df2 = param_dataframe2.copy()
-    df2 = _fix_age(df2)
-    df2 = _fix_signup_date(df2, {"invalid_date": pd.NaT, "2025-02-29": "2025-02-28"})
-    df2 = _fix_email(df2, param_specific_fix="format_name")
-    df2 = _fix_country(df2, {"France": "FR"})
-    df2 = _fix_purchase_amount(df2)
-    df2 = _drop_duplicate_emails(df2)
-
-    # Clean Dataframe 3
-    df3 = param_dataframe3.copy()
-    df3 = _fix_age(df3, param_invalid_values=["abc"])
-    df3 = _fix_signup_date(df3, {
-        "not_a_date": pd.NaT,
-        "2025-13-01": "2025-12-01",
-        "2024-02-29": "2024-02-28",
-        "2025-02-30": "2025-02-28"
-    })
-    df3 = _fix_email(df3, param_specific_fix="missing_domain")
-    df3["prenom"] = df3["full_name"].str.split().str[0]
-    df3["nom"] = df3["full_name"].str.split().str[1]
-    df3.dropna(subset=["prenom", "nom"] if "prenom" in df3.columns else [], inplace=True)
-    df3.drop(columns=["prenom", "nom"] if "prenom" in df3.columns else [], inplace=True)
-    df3 = _fix_country(df3, {"France": "FR", "FRA": "FR", "USA": "US"})
-    df3 = _fix_purchase_amount(df3)
-    df3["loyalty_tier"] = df3["loyalty_tier"].replace("UNKNOWN", "BRONZE")
-    df3 = _drop_duplicate_emails(df3)
-
-    # Store deletion counts in dataframe attributes
-    df1.attrs["rows_deleted"] = original_count1 - len(df1)
-    df2.attrs["rows_deleted"] = original_count2 - len(df2)
-    df3.attrs["rows_deleted"] = original_count3 - len(df3)
+    df1 = clean_customer_source(param_dataframe1, "customers_dirty.csv")
+    df2 = clean_customer_source(param_dataframe2, "customers_dirty2.csv")
+    df3 = clean_customer_source(param_dataframe3, "customers_dirty3.csv")
 
     return df1, df2, df3
 
 # -----
 
-def save_cleaned_data(param_dataframe1: pd.DataFrame, param_dataframe2: pd.DataFrame, param_dataframe3: pd.DataFrame) -> None:
+def processed_file_path(param_file_name: str, param_compression: str = None) -> str:
+    """
+    Return the path a processed file is written to.
+
+    Args:
+        param_file_name: Processed file name, e.g. customers_cleaned2.csv
+        param_compression: Output compression, "gzip" or "zstd", None for plain CSV
+
+    Returns:
+        str: Path to write the processed file to
+    """
+
+    path = os.path.join(os.getcwd(), "data", "processed", param_file_name)
+    suffixes = {compression: suffix for suffix, compression in COMPRESSION_SUFFIXES.items()}
+
+    return path + suffixes[param_compression] if param_compression else path
+
+# -----
+
+def remove_stale_variants(param_path: str) -> None:
+    """
+    Remove the variants of a processed file written with another compression,
+    and their lookup indexes. Called once the file itself has been written, so
+    a failed write never leaves the source without output.
+    """
+
+    path = strip_compression_suffix(param_path)
+
+    for stale_path in [path + suffix for suffix in ["", *COMPRESSION_SUFFIXES]]:
+        if stale_path != param_path and os.path.exists(stale_path):
+            os.remove(stale_path)
+            if os.path.exists(stale_path + INDEX_SUFFIX):
+                os.remove(stale_path + INDEX_SUFFIX)
+
+    return None
+
+# -----
+
+def _write_processed_file(param_dataframe: pd.DataFrame, param_file_name: str, param_compression: str = None) -> str:
+    """ Write a processed CSV file, optionally compressed, replacing its other variants. """
+
+    path = write_csv(param_dataframe, processed_file_path(param_file_name, param_compression))
+    remove_stale_variants(path)
+
+    return path
+
+# -----
+
+def save_cleaned_data(param_dataframe1: pd.DataFrame, param_dataframe2: pd.DataFrame, param_dataframe3: pd.DataFrame, param_compression: str = None) -> None:
     """
     Save cleaned customer dataframes to processed CSV files.
-    Displays the number of rows deleted during cleaning for each file.
+    Displays the number of rows deleted during cleaning for each file
+    and refreshes the customer lookup indexes of the written files.
 
     Args:
         param_dataframe1: First cleaned customers dataframe
         param_dataframe2: Second cleaned customers dataframe
         param_dataframe3: Third cleaned customers dataframe
+        param_compression: Output compression, "gzip" or "zstd", None for plain CSV
     """
 
-    param_dataframe1.to_csv(
-        os.path.join(
-            os.getcwd(),
-            "data",
-            "processed",
-            "customers_cleaned.csv"
-        ),
-        index=False
-    )
+    _write_processed_file(param_dataframe1, "customers_cleaned.csv", param_compression)
     rows_deleted_1 = param_dataframe1.attrs.get("rows_deleted", 0)
     print(f"Fichier 1: {rows_deleted_1} ligne(s) supprimée(s)")
 
-    param_dataframe2.to_csv(
-        os.path.join(
-            os.getcwd(),
-            "data",
-            "processed",
-            "customers_cleaned2.csv"
-        ),
-        index=False
-    )
+    _write_processed_file(param_dataframe2, "customers_cleaned2.csv", param_compression)
     rows_deleted_2 = param_dataframe2.attrs.get("rows_deleted", 0)
     print(f"Fichier 2: {rows_deleted_2} ligne(s) supprimée(s)")
 
-    param_dataframe3.to_csv(
-        os.path.join(
-            os.getcwd(),
-            "data",
-            "processed",
-            "customers_cleaned3.csv"
-        ),
-        index=False
-    )
+    _write_processed_file(param_dataframe3, "customers_cleaned3.csv", param_compression)
     rows_deleted_3 = param_dataframe3.attrs.get("rows_deleted", 0)
     print(f"Fichier 3: {rows_deleted_3} ligne(s) supprimée(s)")
 
+    refresh_lookup_indexes(os.path.join(os.getcwd(), "data", "processed"))
+
+    return None
+
+# -----
+
+def save_cleaned_source(param_dataframe: pd.DataFrame, param_file_name: str, param_compression: str = None) -> str:
+    """
+    Save the cleaned dataframe of a single raw source to its processed file.
+    The lookup indexes are left to refresh once every source is saved.
+
+    Args:
+        param_dataframe: Cleaned customers dataframe
+        param_file_name: Raw file name the dataframe comes from
+        param_compression: Output compression, "gzip" or "zstd", None for plain CSV
+
+    Returns:
+        str: Path of the written processed file
+    """
+
+    path = _write_processed_file(param_dataframe, cleaned_file_name(param_file_name), param_compression)
+    print(f"{param_file_name}: {param_dataframe.attrs.get('rows_deleted', 0)} ligne(s) supprimée(s)")
+
+    return path
+
+# -----
+
+def cleaned_file_name(param_file_name: str) -> str:
+    """ Return the processed file name of a raw file, e.g. customers_cleaned2.csv for customers_dirty2.csv. """
+
+    return param_file_name.replace("customers_dirty", "customers_cleaned", 1)
+
+# -----
+
+def cleaned_part_path(param_file_name: str, param_shard: int = 0, param_shards: int = 1) -> str:
+    """ Return the path of the cleaned part of a raw source shard, creating its directory. """
+
+    parts_dir = os.path.join(
+        os.getcwd(),
+        "data",
+        "processed",
+        "parts",
+        os.path.splitext(cleaned_file_name(param_file_name))[0]
+    )
+    os.makedirs(parts_dir, exist_ok=True)
+
+    return os.path.join(parts_dir, f"part-{param_shard:04d}-of-{param_shards:04d}.csv")
+
+# -----
+
+def save_cleaned_part(param_dataframe: pd.DataFrame, param_file_name: str, param_shard: int = 0, param_shards: int = 1) -> str:
+    """
+    Save the cleaned shard of a raw source under data/processed/parts.
+    Parts are combined into the processed file by combine_cleaned_parts. Rows
+    are saved with their position in the raw source, taken from the index,
+    for the combination to restore the source order. The signup date counts
+    of a shard cleaned without date filling are saved next to it, for the
+    combination to fill dates with the source median.
+
+    Args:
+        param_dataframe: Cleaned customers dataframe of the shard
+        param_file_name: Raw file name the shard comes from
+        param_shard: Index of the shard
+        param_shards: Total number of shards
+
+    Returns:
+        str: Path of the written part file
+    """
+
+    part_path = cleaned_part_path(param_file_name, param_shard, param_shards)
+    write_csv(param_dataframe.rename_axis(PART_ROW_COLUMN).reset_index(), part_path)
+
+    if "signup_date_counts" in param_dataframe.attrs:
+        save_part_date_counts(part_path, date_count_items(param_dataframe.attrs["signup_date_counts"]))
+
+    rows_deleted = param_dataframe.attrs.get("rows_deleted", 0)
+    print(f"{param_file_name} [{param_shard + 1}/{param_shards}]: {rows_deleted} ligne(s) supprimée(s)")
+
+    return part_path
+
+# -----
+
+def save_part_date_counts(param_part_path: str, param_items: list) -> str:
+    """ Save the signup date counts of a cleaned part next to it, as [nanoseconds since epoch, count] pairs. """
+
+    counts_path = param_part_path + PART_DATE_COUNTS_SUFFIX
+    with atomic_output_path(counts_path) as temporary_path, open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(param_items, file)
+
+    return counts_path
+
+# -----
+
+def _load_parts_date_counts(param_part_paths: list) -> list:
+    """ Concatenate the saved signup date counts of cleaned parts, None when a part has none. """
+
+    items = []
+    for part_path in param_part_paths:
+        if not os.path.exists(part_path + PART_DATE_COUNTS_SUFFIX):
+            return None
+
+        with open(part_path + PART_DATE_COUNTS_SUFFIX, encoding="utf-8") as file:
+            items += json.load(file)
+
+    return items
+
+# -----
+
+def combine_cleaned_parts(param_compression: str = None, param_clusters: bool = False) -> dict:
+    """
+    Combine the cleaned parts of every source into its processed file.
+    Rows are put back in the order of the raw source and missing signup
+    dates are filled with the median of the whole source, computed from the
+    date counts of the parts. Shards are keyed on the raw email, so two
+    spellings of an email repaired to the same address may survive in two
+    parts: emails are de-duplicated again on the combined rows. With
+    param_clusters, near-duplicate clusters are computed on the combined rows,
+    since they may span shards.
+    The input profiles of the parts are merged with these drops and the
+    profile of the combined rows into the "profile" attrs of each combined
+    dataframe, and the lookup indexes are refreshed.
+
+    Args:
+        param_compression: Output compression, "gzip" or "zstd", None for plain CSV
+        param_clusters: Whether to add a cluster_id column grouping near-duplicate customers
+
+    Returns:
+        dict: Combined dataframes keyed by processed file name
+    """
+
+    processed_dir = os.path.join(os.getcwd(), "data", "processed")
+    parts_root = os.path.join(processed_dir, "parts")
+    combined = {}
+
+    for source in sorted(os.listdir(parts_root)) if os.path.isdir(parts_root) else []:
+        source_dir = os.path.join(parts_root, source)
+        part_names = [name for name in os.listdir(source_dir) if name.startswith("part-") and name.endswith(".csv")]
+        if not part_names:
+            continue
+
+        # Parts are cleared after every merge, so they must all come from a single sharding
+        shardings = sorted({int(name[len("part-0000-of-"):-len(".csv")]) for name in part_names})
+        if len(shardings) > 1:
+            raise ValueError(f"Cleaned parts of {source} come from several shardings {shardings}, clear {source_dir} and clean its shards again.")
+        part_names = [f"part-{shard:04d}-of-{shardings[0]:04d}.csv" for shard in range(shardings[0])]
+
+        missing = [name for name in part_names if not os.path.exists(os.path.join(source_dir, name))]
+        if missing:
+            raise FileNotFoundError(f"Missing cleaned part(s) of {source}: {missing}.")
+
+        part_paths = [os.path.join(source_dir, name) for name in part_names]
+        dataframe = pd.concat([pd.read_csv(path) for path in part_paths], ignore_index=True)
+        if PART_ROW_COLUMN in dataframe.columns:
+            dataframe = dataframe.sort_values(PART_ROW_COLUMN, kind="stable").drop(columns=PART_ROW_COLUMN).reset_index(drop=True)
+
+        dataframe.attrs["repairs"] = {}
+        dataframe = _drop_duplicate_emails(dataframe)
+
+        date_counts = _load_parts_date_counts(part_paths)
+        if date_counts is not None:
+            signup_date = pd.to_datetime(dataframe["signup_date"], format="%Y-%m-%d").astype("datetime64[ns]")
+            dataframe["signup_date"] = signup_date.fillna(median_of_date_counts(date_counts))
+
+        if param_clusters:
+            dataframe = assign_duplicate_clusters(dataframe)
+
+        profile = load_parts_profile(part_paths)
+        if profile is not None:
+            # The output of the parts is profiled again, as it was before the last de-duplication
+            inputs = {key: profile[key] for key in ["rows_in", "nulls", "repairs"]}
+            dataframe.attrs["profile"] = merge_profiles(inputs, {"repairs": dataframe.attrs["repairs"]}, profile_output(dataframe))
+            dataframe.attrs["rows_deleted"] = profile["rows_in"] - len(dataframe)
+
+        _write_processed_file(dataframe, f"{source}.csv", param_compression)
+        combined[f"{source}.csv"] = dataframe
+
+    refresh_lookup_indexes(processed_dir)
+
+    return combined
+
+# -----
+
+def clear_cleaned_parts() -> None:
+    """ Remove the cleaned parts and their sidecar files once they have been merged. """
+
+    shutil.rmtree(os.path.join(os.getcwd(), "data", "processed", "parts"), ignore_errors=True)
+
     return None
@@ -0,0 +1,303 @@
+""" Read and write compressed customer CSV files. """
+
+import io
+import os
+import mmap
+import zlib
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+# Compression of each supported file suffix
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+# Uncompressed size of each gzip member or zstd frame written by write_csv
+COMPRESSED_BLOCK_SIZE = 4 * 1024 * 1024
+# Compressed bytes read at once while decompressing a single block
+_BLOCK_READ_SIZE = 64 * 1024
+
+_GZIP_MAGIC = b"\x1f\x8b\x08"
+
+# -----
+
+def compression_of(param_path: str) -> str:
+    """ Return the compression of a file from its suffix, None when uncompressed. """
+
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(param_path)[1])
+
+# -----
+
+def strip_compression_suffix(param_file_name: str) -> str:
+    """ Return a file name without its compression suffix, e.g. customers_dirty.csv for customers_dirty.csv.gz. """
+
+    root, suffix = os.path.splitext(param_file_name)
+
+    return root if suffix in COMPRESSION_SUFFIXES else param_file_name
+
+# -----
+
+@contextmanager
+def atomic_output_path(param_path: str):
+    """
+    Yield a hidden temporary path next to param_path, moved over it once the
+    block completes, so readers never see a partially written file.
+    The file is flushed to disk before the move; it is removed on failure.
+
+    Args:
+        param_path: Final path of the file
+
+    Yields:
+        str: Temporary path to write the file to
+    """
+
+    directory, file_name = os.path.split(param_path)
+    temporary_path = os.path.join(directory, f".{file_name}.{os.getpid()}.tmp")
+
+    try:
+        yield temporary_path
+
+        with open(temporary_path, "rb") as file:
+            os.fsync(file.fileno())
+        os.replace(temporary_path, param_path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+
+# -----
+
+def resolve_path(param_path: str) -> str:
+    """
+    Return the existing path of a CSV file, compressed or not.
+    The plain file wins, then the gzip and zstd variants.
+
+    Args:
+        param_path: Path of the uncompressed CSV file
+
+    Returns:
+        str: Path of the existing file
+    """
+
+    for suffix in ["", *COMPRESSION_SUFFIXES]:
+        if os.path.exists(param_path + suffix):
+            return param_path + suffix
+
+    raise FileNotFoundError(f"No file found for '{param_path}' (plain, gzip or zstd).")
+
+# -----
+
+def _decompress_gzip_member(param_member: bytes) -> bytes:
+    """ Decompress one gzip member, failing when it is not exactly one complete member. """
+
+    decompressor = zlib.decompressobj(wbits=31)
+    content = decompressor.decompress(param_member) + decompressor.flush()
+
+    if not decompressor.eof or decompressor.unused_data:
+        raise zlib.error("Not a single complete gzip member.")
+
+    return content
+
+# -----
+
+def _compress_gzip_member(param_block: bytes) -> bytes:
+    """ Compress a block of bytes into one complete gzip member. """
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    return compressor.compress(param_block) + compressor.flush()
+
+# -----
+
+def _compress_block(param_block: bytes, param_compression: str) -> bytes:
+    """ Compress a block of bytes into one complete gzip member or zstd frame. """
+
+    if param_compression == "gzip":
+        return _compress_gzip_member(param_block)
+
+    import zstandard
+
+    return zstandard.ZstdCompressor().compress(param_block)
+
+# -----
+
+def read_compressed_block(param_path: str, param_offset: int) -> tuple:
+    """
+    Decompress the single gzip member or zstd frame starting at a byte offset of a file.
+
+    Args:
+        param_path: Path of the compressed file
+        param_offset: Byte offset of the block in the file
+
+    Returns:
+        tuple: Decompressed block and byte offset of the next block
+    """
+
+    if compression_of(param_path) == "gzip":
+        decompressor = zlib.decompressobj(wbits=31)
+    else:
+        import zstandard
+
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    blocks, offset = [], param_offset
+    with open(param_path, "rb") as file:
+        file.seek(param_offset)
+        while not decompressor.eof:
+            data = file.read(_BLOCK_READ_SIZE)
+            if not data:
+                raise ValueError(f"Truncated compressed block at offset {param_offset} of '{param_path}'.")
+
+            blocks.append(decompressor.decompress(data))
+            offset += len(data) - len(decompressor.unused_data)
+
+    return b"".join(blocks), offset
+
+# -----
+
+def iter_compressed_blocks(param_path: str):
+    """
+    Iterate over the gzip members or zstd frames of a compressed file.
+
+    Args:
+        param_path: Path of the compressed file
+
+    Yields:
+        tuple: Byte offset of the block in the file and its decompressed content
+    """
+
+    offset, size = 0, os.path.getsize(param_path)
+
+    while offset < size:
+        content, next_offset = read_compressed_block(param_path, offset)
+        yield offset, content
+        offset = next_offset
+
+    return None
+
+# -----
+
+def _decompress_gzip_parallel(param_path: str, param_workers: int) -> bytes:
+    """
+    Decompress a multi-member gzip file with one thread per member.
+    Members are split at candidate gzip headers; a header false positive
+    inside compressed data yields an incomplete member and the file is
+    reported as not splittable.
+
+    Returns:
+        bytes: Decompressed content, or None for single-member or unsplittable files
+    """
+
+    with open(param_path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+        starts = []
+        position = content.find(_GZIP_MAGIC)
+        while position != -1:
+            starts.append(position)
+            position = content.find(_GZIP_MAGIC, position + 1)
+
+        if len(starts) < 2 or starts[0] != 0:
+            return None
+
+        members = [content[start:end] for start, end in zip(starts, starts[1:] + [len(content)])]
+
+    try:
+        with ThreadPoolExecutor(max_workers=param_workers) as executor:
+            return b"".join(executor.map(_decompress_gzip_member, members))
+    except zlib.error:
+        return None
+
+# -----
+
+def read_csv(param_path: str, param_workers: int = None, **param_read_options) -> pd.DataFrame:
+    """
+    Read a CSV file that may be gzip or zstd compressed, without decompressing it to disk.
+    Multi-member gzip files are decoded in parallel; other files are read
+    through pandas streaming decompression.
+
+    Args:
+        param_path: Path of the CSV file
+        param_workers: Number of decompression threads, defaults to the number of CPUs
+        param_read_options: Options forwarded to pd.read_csv
+
+    Returns:
+        pd.DataFrame: File content
+    """
+
+    compression = compression_of(param_path)
+
+    if compression == "gzip" and os.path.getsize(param_path) > 0:
+        content = _decompress_gzip_parallel(param_path, param_workers or os.cpu_count() or 1)
+
+        if content is not None:
+            return pd.read_csv(io.BytesIO(content), **param_read_options)
+
+    return pd.read_csv(param_path, compression=compression, **param_read_options)
+
+# -----
+
+def write_csv(param_dataframe: pd.DataFrame, param_path: str, param_workers: int = None) -> str:
+    """
+    Write a dataframe to CSV, compressed according to the file suffix.
+    Compressed output is written as independent gzip members or zstd frames
+    of COMPRESSED_BLOCK_SIZE bytes, compressed in parallel threads, so gzip
+    can be decoded in parallel too and a lookup only decompresses one block.
+
+    Args:
+        param_dataframe: Dataframe to write
+        param_path: Destination path, ending with .csv, .csv.gz or .csv.zst
+        param_workers: Number of compression threads, defaults to the number of CPUs
+
+    Returns:
+        str: Path of the written file
+    """
+
+    compression = compression_of(param_path)
+
+    if compression is None:
+        with atomic_output_path(param_path) as temporary_path:
+            param_dataframe.to_csv(temporary_path, index=False)
+        return param_path
+
+    content = param_dataframe.to_csv(index=False).encode("utf-8")
+
+    # Cut blocks on line boundaries so each one is a valid CSV fragment
+    blocks, start = [], 0
+    while start < len(content):
+        end = content.find(b"\n", start + COMPRESSED_BLOCK_SIZE)
+        end = len(content) if end == -1 else end + 1
+        blocks.append(content[start:end])
+        start = end
+
+    with ThreadPoolExecutor(max_workers=param_workers or os.cpu_count() or 1) as executor:
+        compressed = list(executor.map(_compress_block, blocks, [compression] * len(blocks)))
+
+    with atomic_output_path(param_path) as temporary_path, open(temporary_path, "wb") as file:
+        for block in compressed:
+            file.write(block)
+
+    return param_path
+
+# -----
+
+def append_csv(param_dataframe: pd.DataFrame, param_path: str, param_header: bool, param_compression: str = None) -> str:
+    """
+    Append rows to a CSV file, compressed according to param_compression.
+    Each call adds an independent gzip member or zstd frame, which
+    concatenate into a valid compressed file.
+
+    Args:
+        param_dataframe: Rows to append
+        param_path: Destination path
+        param_compression: "gzip" or "zstd", None for plain CSV
+        param_header: Whether to write the header, for the first rows of the file
+
+    Returns:
+        str: Path of the written file
+    """
+
+    content = param_dataframe.to_csv(index=False, header=param_header).encode("utf-8")
+
+    if param_compression is not None:
+        content = _compress_block(content, param_compression)
+
+    with open(param_path, "ab" if not param_header else "wb") as file:
+        file.write(content)
+
+    return param_path
@@ -0,0 +1,221 @@
+""" Detect near-duplicate customers with blocking, sorted neighbourhoods and sparse string similarity. """
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Number of hashed character bigram buckets used by the similarity vectors
+_BIGRAM_BUCKETS = 1024
+# Candidate pairs scored by a single worker task
+_PAIRS_PER_TASK = 200_000
+
+# -----
+
+def _normalize_text(param_series: pd.Series) -> pd.Series:
+    """ Lowercase, strip accents and collapse whitespace of a text column. """
+
+    return (
+        param_series.fillna("").astype(str)
+        .str.normalize("NFKD").str.encode("ascii", errors="ignore").str.decode("ascii")
+        .str.lower()
+        .str.replace(r"[^a-z0-9@._ -]", "", regex=True)
+        .str.split().str.join(" ")
+    )
+
+# -----
+
+def _blocking_keys(param_names: pd.Series, param_locals: pd.Series, param_prefix_length: int) -> pd.DataFrame:
+    """
+    Build the (row, block key) candidates of a frame.
+    A row belongs to the block of its sorted name tokens and to the block
+    of its email local-part prefix.
+    """
+
+    rows = np.arange(len(param_names))
+
+    name_keys = "name:" + param_names.str.split().apply(sorted).str.join(" ")
+    email_keys = "email:" + param_locals.str[:param_prefix_length]
+
+    keys = pd.DataFrame({
+        "row": np.concatenate([rows, rows]),
+        "key": np.concatenate([name_keys.to_numpy(dtype=object), email_keys.to_numpy(dtype=object)]),
+        "valid": np.concatenate([
+            (param_names != "").to_numpy(),
+            (param_locals.str.len() >= param_prefix_length).to_numpy()
+        ])
+    })
+
+    return keys[keys["valid"]].drop(columns="valid")
+
+# -----
+
+def _bigram_weights(param_values: np.ndarray) -> tuple:
+    """
+    Return the sparse L2-normalized hashed character bigram count vectors of strings.
+
+    Args:
+        param_values: Array of strings
+
+    Returns:
+        tuple: Sorted (string position * _BIGRAM_BUCKETS + bucket) keys and their weights
+    """
+
+    width = max(max(map(len, param_values), default=0), 2)
+    codes = np.asarray(param_values, dtype=f"<U{width}").view(np.uint32).reshape(len(param_values), width)
+
+    present = (codes[:, :-1] != 0) & (codes[:, 1:] != 0)
+    buckets = (codes[:, :-1].astype(np.int64) * 31 + codes[:, 1:]) % _BIGRAM_BUCKETS
+    keys, counts = np.unique((np.arange(len(param_values))[:, None] * _BIGRAM_BUCKETS + buckets)[present], return_counts=True)
+
+    positions = keys // _BIGRAM_BUCKETS
+    norms = np.sqrt(np.bincount(positions, weights=counts.astype(np.float64) ** 2, minlength=len(param_values)))
+
+    return keys, counts / norms[positions]
+
+# -----
+
+def _cosine_similarities(param_left: np.ndarray, param_right: np.ndarray) -> np.ndarray:
+    """
+    Return the bigram cosine similarity of each pair of strings at the same position in two arrays.
+    Each distinct string is vectorized once and each distinct pair of strings
+    scored once, by looking the bigrams of its left string up in the sparse
+    vector of its right string.
+    """
+
+    codes, values = pd.factorize(np.concatenate([param_left, param_right]))
+    keys, weights = _bigram_weights(np.asarray(values, dtype=object))
+    if not len(keys):
+        return np.zeros(len(param_left))
+
+    pair_index, pair_codes = pd.factorize(codes[:len(param_left)] * len(values) + codes[len(param_left):])
+    left, right = pair_codes // len(values), pair_codes % len(values)
+
+    # Bigram entries of the left string of each distinct pair
+    bounds = np.searchsorted(keys, np.arange(len(values) + 1) * _BIGRAM_BUCKETS)
+    lengths = bounds[left + 1] - bounds[left]
+    owners = np.repeat(np.arange(len(pair_codes)), lengths)
+    entries = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(bounds[left], lengths)
+
+    wanted = right[owners] * _BIGRAM_BUCKETS + keys[entries] % _BIGRAM_BUCKETS
+    found = np.minimum(np.searchsorted(keys, wanted), len(keys) - 1)
+    shared = keys[found] == wanted
+
+    similarities = np.bincount(owners[shared], weights=weights[entries[shared]] * weights[found[shared]], minlength=len(pair_codes))
+
+    return similarities[pair_index]
+
+# -----
+
+def _match_pairs(param_task: tuple, param_threshold: float) -> np.ndarray:
+    """
+    Score candidate pairs and return the matching ones.
+    The pair score is the mean of the name and email local-part cosine similarities.
+
+    Args:
+        param_task: Candidate (row, row) pairs, then the names and email local parts of their left and right rows
+        param_threshold: Minimum score for a pair to be a match
+
+    Returns:
+        np.ndarray: Matching (row, row) pairs
+    """
+
+    pairs, left_names, right_names, left_locals, right_locals = param_task
+
+    # Similarities are at most 1, so only pairs with a close enough name can reach the threshold
+    scores = _cosine_similarities(left_names, right_names)
+    candidates = np.flatnonzero(scores >= 2 * param_threshold - 1 - 1e-6)
+    scores = (scores[candidates] + _cosine_similarities(left_locals[candidates], right_locals[candidates])) / 2
+
+    return pairs[candidates[scores >= param_threshold - 1e-6]]
+
+# -----
+
+def _connected_components(param_size: int, param_pairs: np.ndarray) -> np.ndarray:
+    """ Label each row with the smallest row id of its connected component. """
+
+    labels = np.arange(param_size)
+    if not len(param_pairs):
+        return labels
+
+    left, right = param_pairs[:, 0], param_pairs[:, 1]
+
+    while len(left):
+        # Hook the root of each pair on the smaller root, then point every row at its root
+        left_roots, right_roots = labels[left], labels[right]
+        smallest = np.minimum(left_roots, right_roots)
+        np.minimum.at(labels, left_roots, smallest)
+        np.minimum.at(labels, right_roots, smallest)
+        while not np.array_equal(labels[labels], labels):
+            labels = labels[labels]
+
+        # Pairs already inside one component are done
+        pending = labels[left] != labels[right]
+        left, right = left[pending], right[pending]
+
+    return labels
+
+# -----
+
+def assign_duplicate_clusters(param_dataframe: pd.DataFrame, param_threshold: float = 0.75, param_prefix_length: int = 4, param_window: int = 10, param_workers: int = None) -> pd.DataFrame:
+    """
+    Add a cluster_id column grouping near-duplicate customers.
+    Rows are grouped into blocks sharing the same sorted name tokens or email
+    local-part prefix, and sorted by email local part within each block. Each
+    row is only compared with the param_window rows following it in its block
+    (sorted neighbourhood), so the number of comparisons grows linearly with
+    the number of rows. Candidate pairs are scored with sparse bigram vectors,
+    in parallel worker processes when there is enough work.
+
+    Args:
+        param_dataframe: Customers dataframe with email and optionally full_name columns
+        param_threshold: Minimum mean name/email similarity to link two rows
+        param_prefix_length: Length of the email local-part prefix used for blocking
+        param_window: Number of following rows of its block each row is compared with
+        param_workers: Number of worker processes, defaults to the number of CPUs
+
+    Returns:
+        pd.DataFrame: Dataframe with a cluster_id column, equal for rows of the same customer
+    """
+
+    if "full_name" in param_dataframe.columns:
+        names = _normalize_text(param_dataframe["full_name"])
+    else:
+        names = pd.Series("", index=param_dataframe.index)
+    locals_ = _normalize_text(param_dataframe["email"]).str.split("@").str[0].fillna("")
+
+    keys = _blocking_keys(names.reset_index(drop=True), locals_.reset_index(drop=True), param_prefix_length)
+    keys["email"] = locals_.to_numpy(dtype=object)[keys["row"].to_numpy()]
+    keys = keys.sort_values(["key", "email", "row"], kind="stable")
+
+    # Pair each row with the following rows of its block, a pair found in both of its blocks is scored once
+    rows = keys["row"].to_numpy()
+    blocks = pd.factorize(keys["key"])[0]
+    candidates = [np.empty((0, 2), dtype=np.int64)]
+    for offset in range(1, param_window + 1):
+        same_block = blocks[:-offset] == blocks[offset:]
+        candidates.append(np.column_stack([rows[:-offset][same_block], rows[offset:][same_block]]))
+    candidates = np.sort(np.concatenate(candidates), axis=1)
+    candidates = candidates[~pd.Series(candidates[:, 0] * len(param_dataframe) + candidates[:, 1]).duplicated().to_numpy()]
+
+    name_values = names.to_numpy(dtype=str)
+    local_values = locals_.to_numpy(dtype=str)
+    tasks = []
+    for start in range(0, len(candidates), _PAIRS_PER_TASK):
+        pairs = candidates[start:start + _PAIRS_PER_TASK]
+        left, right = pairs[:, 0], pairs[:, 1]
+        tasks.append((pairs, name_values[left], name_values[right], local_values[left], local_values[right]))
+
+    workers = min(param_workers or os.cpu_count() or 1, len(tasks))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_match_pairs, tasks, [param_threshold] * len(tasks)))
+    else:
+        results = [_match_pairs(task, param_threshold) for task in tasks]
+
+    pairs = np.concatenate(results) if results else np.empty((0, 2), dtype=np.int64)
+    labels = _connected_components(len(param_dataframe), pairs)
+
+    param_dataframe["cluster_id"] = pd.factorize(labels)[0]
+
+    return param_dataframe
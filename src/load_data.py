@@ -2,45 +2,100 @@
 
 import os
 import pandas as pd
+from src.compression import read_csv, resolve_path, strip_compression_suffix
+
+RAW_FILE_PREFIX = "customers_dirty"
 
 # -----
 
-def load_customers_data():
+def discover_raw_files(param_raw_dir: str = None) -> list:
     """
-    Load customer data from raw CSV files.
+    List the raw customer files available in the raw data directory.
+    Compressed files are listed under their uncompressed name.
+
+    Args:
+        param_raw_dir: Raw data directory, defaults to data/raw
 
     Returns:
-        tuple: Three dataframes containing customer data from the raw files
+        list: Sorted raw file names, e.g. customers_dirty2.csv for customers_dirty2.csv.gz
     """
 
-    dataframe_customers_dirty = pd.read_csv(
-        os.path.join(
-            os.getcwd(),
-            "data",
-            "raw",
-            "customers_dirty.csv"
-        ),
-        sep=","
-    )
+    raw_dir = param_raw_dir or os.path.join(os.getcwd(), "data", "raw")
 
-    dataframe_customers_dirty_2 = pd.read_csv(
-        os.path.join(
-            os.getcwd(),
-            "data",
-            "raw",
-            "customers_dirty2.csv"
-        ),
-        sep=","
-    )
+    return sorted({
+        strip_compression_suffix(name) for name in os.listdir(raw_dir)
+        if name.startswith(RAW_FILE_PREFIX) and strip_compression_suffix(name).endswith(".csv")
+    })
+
+# -----
+
+def select_shard(param_dataframe: pd.DataFrame, param_shard: int = None, param_shards: int = None) -> pd.DataFrame:
+    """
+    Keep the rows of a single shard, sharded on the hash of the lowercased email.
+    The rows keep their index, so the source order can be restored when the
+    shards are combined.
+
+    Args:
+        param_dataframe: Raw customers dataframe
+        param_shard: Index of the shard to keep
+        param_shards: Total number of shards, no sharding when None or 1
+
+    Returns:
+        pd.DataFrame: Rows of the shard
+    """
+
+    if not param_shards or param_shards <= 1:
+        return param_dataframe
+
+    email_key = param_dataframe["email"].fillna("").str.strip().str.lower()
+    shard_ids = pd.util.hash_pandas_object(email_key, index=False).to_numpy() % param_shards
 
-    dataframe_customers_dirty_3 = pd.read_csv(
-        os.path.join(
-            os.getcwd(),
-            "data",
-            "raw",
-            "customers_dirty3.csv"
+    return param_dataframe[shard_ids == param_shard]
+
+# -----
+
+def load_customer_source(param_file_name: str, param_shard: int = None, param_shards: int = None) -> pd.DataFrame:
+    """
+    Load one raw customer file, optionally keeping a single shard of its rows.
+    The file may be stored gzip or zstd compressed next to its plain name.
+    Rows are sharded on the hash of their lowercased email so that duplicates
+    of a customer always land in the same shard.
+
+    Args:
+        param_file_name: Uncompressed raw file name, e.g. customers_dirty2.csv
+        param_shard: Index of the shard to keep
+        param_shards: Total number of shards
+
+    Returns:
+        pd.DataFrame: Customer data of the file or shard
+    """
+
+    dataframe = read_csv(
+        resolve_path(
+            os.path.join(
+                os.getcwd(),
+                "data",
+                "raw",
+                param_file_name
+            )
         ),
         sep=","
     )
 
+    return select_shard(dataframe, param_shard, param_shards)
+
+# -----
+
+def load_customers_data():
+    """
+    Load customer data from raw CSV files.
+
+    Returns:
+        tuple: Three dataframes containing customer data from the raw files
+    """
+
+    dataframe_customers_dirty = load_customer_source("customers_dirty.csv")
+    dataframe_customers_dirty_2 = load_customer_source("customers_dirty2.csv")
+    dataframe_customers_dirty_3 = load_customer_source("customers_dirty3.csv")
+
     return dataframe_customers_dirty, dataframe_customers_dirty_2, dataframe_customers_dirty_3
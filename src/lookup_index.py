@@ -0,0 +1,253 @@
+""" Build and query persisted lookup indexes over processed customer files. """
+
+import os
+import csv
+import numpy as np
+import pandas as pd
+from src.compression import atomic_output_path, compression_of, iter_compressed_blocks, read_compressed_block, strip_compression_suffix
+
+INDEX_SUFFIX = ".idx.npz"
+INDEXED_FILE_PREFIX = "customers_cleaned"
+
+# Loaded indexes, keyed by index path: (index mtime, arrays)
+_INDEX_CACHE = {}
+
+# -----
+
+def _default_processed_dir() -> str:
+    """ Return the default processed data directory. """
+
+    return os.path.join(os.getcwd(), "data", "processed")
+
+# -----
+
+def _index_path(param_csv_path: str) -> str:
+    """ Return the index file path associated with a processed CSV file. """
+
+    return param_csv_path + INDEX_SUFFIX
+
+# -----
+
+def _indexed_files(param_processed_dir: str) -> list:
+    """ List the processed CSV files, plain or compressed, that carry a lookup index, in name order. """
+
+    if not os.path.isdir(param_processed_dir):
+        return []
+
+    return [
+        os.path.join(param_processed_dir, name)
+        for name in sorted(os.listdir(param_processed_dir))
+        if name.startswith(INDEXED_FILE_PREFIX) and strip_compression_suffix(name).endswith(".csv")
+    ]
+
+# -----
+
+def _line_starts(param_content: bytes) -> np.ndarray:
+    """ Return the start offset of every line of a block of CSV content. """
+
+    content = np.frombuffer(param_content, dtype=np.uint8)
+    line_starts = np.concatenate(([0], np.flatnonzero(content == ord("\n")) + 1)).astype(np.int64)
+
+    return line_starts[line_starts < len(content)]
+
+# -----
+
+def _sorted_keys(param_keys: pd.Series, param_rows: np.ndarray) -> tuple:
+    """ Sort keys and their row numbers together, dropping empty keys. """
+
+    keys = param_keys.to_numpy(dtype=str)
+    present = keys != ""
+    keys = keys[present]
+    rows = param_rows[present]
+
+    order = np.argsort(keys, kind="stable")
+
+    return keys[order], rows[order]
+
+# -----
+
+def build_lookup_index(param_csv_path: str) -> str:
+    """
+    Build the sorted key/offset index of a processed CSV file.
+    The index stores, for customer_id and email, the sorted keys and the byte
+    offset of the matching row, so a lookup is a binary search plus one seek.
+    For a compressed file, the offset is taken within the decompressed gzip
+    member or zstd frame holding the row, whose own offset in the file is
+    stored too, so a lookup decompresses that single block.
+
+    Args:
+        param_csv_path: Path of the processed CSV file to index, compressed or not
+
+    Returns:
+        str: Path of the written index file
+    """
+
+    stat = os.stat(param_csv_path)
+
+    compression = compression_of(param_csv_path)
+
+    # Start offset of every line after the header, and of its compressed block
+    if compression is None:
+        with open(param_csv_path, "rb") as file:
+            row_offsets = _line_starts(file.read())[1:]
+        row_blocks = None
+    else:
+        offsets, blocks = [], []
+        for block_offset, content in iter_compressed_blocks(param_csv_path):
+            offsets.append(_line_starts(content)[0 if offsets else 1:])
+            blocks.append(np.full(len(offsets[-1]), block_offset, dtype=np.int64))
+        row_offsets = np.concatenate(offsets) if offsets else np.empty(0, dtype=np.int64)
+        row_blocks = np.concatenate(blocks) if blocks else np.empty(0, dtype=np.int64)
+
+    keys = pd.read_csv(
+        param_csv_path,
+        usecols=["customer_id", "email"],
+        dtype=str,
+        keep_default_na=False,
+        compression=compression
+    )
+    if len(keys) != len(row_offsets):
+        raise ValueError(f"Cannot index '{param_csv_path}': records spanning several lines are not supported.")
+
+    arrays = {"source_stat": np.array([stat.st_size, stat.st_mtime_ns], dtype=np.int64)}
+    rows = np.arange(len(row_offsets))
+    for field, field_keys in [("customer_id", keys["customer_id"].str.strip()), ("email", keys["email"].str.strip().str.lower())]:
+        arrays[f"{field}_keys"], field_rows = _sorted_keys(field_keys, rows)
+        arrays[f"{field}_offsets"] = row_offsets[field_rows]
+        if row_blocks is not None:
+            arrays[f"{field}_blocks"] = row_blocks[field_rows]
+
+    index_path = _index_path(param_csv_path)
+    with atomic_output_path(index_path) as temporary_path, open(temporary_path, "wb") as file:
+        np.savez(file, **arrays)
+
+    return index_path
+
+# -----
+
+def _is_stale(param_csv_path: str, param_source_stat: np.ndarray) -> bool:
+    """ Check whether a CSV file changed since its index was built. """
+
+    stat = os.stat(param_csv_path)
+
+    return param_source_stat[0] != stat.st_size or param_source_stat[1] != stat.st_mtime_ns
+
+# -----
+
+def _load_index(param_csv_path: str) -> dict:
+    """ Load the index of a CSV file, building or rebuilding it when missing or stale. """
+
+    index_path = _index_path(param_csv_path)
+
+    if not os.path.exists(index_path):
+        build_lookup_index(param_csv_path)
+
+    index_mtime = os.stat(index_path).st_mtime_ns
+    cached = _INDEX_CACHE.get(index_path)
+    if cached is not None and cached[0] == index_mtime:
+        index = cached[1]
+    else:
+        with np.load(index_path) as archive:
+            index = {name: archive[name] for name in archive.files}
+
+    # The CSV may have been rewritten since the index was built or cached
+    if _is_stale(param_csv_path, index["source_stat"]):
+        build_lookup_index(param_csv_path)
+        return _load_index(param_csv_path)
+
+    if "header" in index:
+        return index
+
+    if compression_of(param_csv_path) is None:
+        with open(param_csv_path, "rb") as file:
+            header = file.readline()
+    else:
+        header = read_compressed_block(param_csv_path, 0)[0].split(b"\n", 1)[0]
+    index["header"] = next(csv.reader([header.decode("utf-8")]))
+
+    _INDEX_CACHE[index_path] = (index_mtime, index)
+
+    return index
+
+# -----
+
+def refresh_lookup_indexes(param_processed_dir: str = None) -> list:
+    """
+    Incrementally refresh the lookup indexes of the processed directory.
+    Only files that are new or changed since their index was built are re-indexed.
+
+    Args:
+        param_processed_dir: Processed data directory, defaults to data/processed
+
+    Returns:
+        list: Paths of the CSV files that were (re)indexed
+    """
+
+    processed_dir = param_processed_dir or _default_processed_dir()
+    rebuilt = []
+
+    for csv_path in _indexed_files(processed_dir):
+        index_path = _index_path(csv_path)
+
+        if os.path.exists(index_path):
+            with np.load(index_path) as archive:
+                if not _is_stale(csv_path, archive["source_stat"]):
+                    continue
+
+        build_lookup_index(csv_path)
+        rebuilt.append(csv_path)
+
+    return rebuilt
+
+# -----
+
+def lookup_customer(param_customer_id=None, param_email: str = None, param_processed_dir: str = None) -> dict:
+    """
+    Return the processed row of a customer, looked up by customer_id or email.
+    Files are searched in name order and the first match is returned. In a
+    compressed file, the lookup decompresses the gzip member or zstd frame
+    holding the row: up to COMPRESSED_BLOCK_SIZE bytes for files written by
+    the pipeline, but the whole file for a single-block file written by
+    another tool.
+
+    Args:
+        param_customer_id: Customer identifier to look up
+        param_email: Email to look up (case insensitive)
+        param_processed_dir: Processed data directory, defaults to data/processed
+
+    Returns:
+        dict: Row values as strings keyed by column name, or None when not found
+    """
+
+    if param_customer_id is None and param_email is None:
+        raise ValueError("Either param_customer_id or param_email must be provided.")
+
+    if param_customer_id is not None:
+        key, field = str(param_customer_id).strip(), "customer_id"
+    else:
+        key, field = param_email.strip().lower(), "email"
+
+    processed_dir = param_processed_dir or _default_processed_dir()
+
+    for csv_path in _indexed_files(processed_dir):
+        index = _load_index(csv_path)
+        keys = index[f"{field}_keys"]
+
+        position = np.searchsorted(keys, key)
+        if position == len(keys) or keys[position] != key:
+            continue
+
+        offset = int(index[f"{field}_offsets"][position])
+        if f"{field}_blocks" in index:
+            content = read_compressed_block(csv_path, int(index[f"{field}_blocks"][position]))[0]
+            line = content[offset:content.find(b"\n", offset) + 1 or len(content)].decode("utf-8")
+        else:
+            with open(csv_path, "rb") as file:
+                file.seek(offset)
+                line = file.readline().decode("utf-8")
+
+        values = next(csv.reader([line]))
+
+        return dict(zip(index["header"], values))
+
+    return None
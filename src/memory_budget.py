@@ -0,0 +1,418 @@
+""" Clean large customer sources in chunks sized to fit a memory budget. """
+
+import os
+import re
+import uuid
+import sqlite3
+import resource
+import numpy as np
+import pandas as pd
+from src.checkpoint import RunCheckpoint
+from src.clean_data import PART_ROW_COLUMN, clean_customer_source, cleaned_file_name, median_of_date_counts
+from src.compression import append_csv, atomic_output_path, compression_of, resolve_path
+from src.entity_resolution import assign_duplicate_clusters
+from src.load_data import select_shard
+from src.profiling import merge_profiles, profile_input, profile_output
+
+# Ratio between the peak memory of a chunk being cleaned and its loaded size
+WORKING_SET_FACTOR = 6
+# Share of the budget the in-memory de-duplication keys and date sketch may use
+STATE_BUDGET_SHARE = 0.2
+# Approximate memory used by one in-memory email key or date sketch entry
+_STATE_ENTRY_BYTES = 120
+SAMPLE_ROWS = 1000
+# Text columns read as strings, so a chunk where they are all missing keeps the string dtype
+_TEXT_COLUMN_DTYPES = {column: "str" for column in ["full_name", "email", "signup_date", "country", "loyalty_tier"]}
+# Email key of rows without email, so they are de-duplicated like drop_duplicates does
+_MISSING_EMAIL_KEY = "\x00"
+
+_MEMORY_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+# -----
+
+def parse_memory_size(param_size: str) -> int:
+    """ Parse a memory size such as 512M, 2G or 1048576 into bytes. """
+
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*", str(param_size), flags=re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid memory size: '{param_size}'.")
+
+    return int(float(match.group(1)) * _MEMORY_UNITS[match.group(2).upper()])
+
+# -----
+
+def estimate_row_bytes(param_path: str, param_sample_rows: int = SAMPLE_ROWS) -> float:
+    """
+    Estimate the in-memory footprint of one row of a raw file from a sample of its first rows.
+
+    Args:
+        param_path: Path of the raw file, compressed or not
+        param_sample_rows: Number of rows to sample
+
+    Returns:
+        float: Estimated bytes per loaded row
+    """
+
+    sample = pd.read_csv(param_path, nrows=param_sample_rows, compression=compression_of(param_path))
+
+    if sample.empty:
+        return 1.0
+
+    return sample.memory_usage(index=True, deep=True).sum() / len(sample)
+
+# -----
+
+def choose_chunk_rows(param_row_bytes: float, param_budget_bytes: int) -> int:
+    """ Return the number of rows per chunk keeping the cleaning working set within the budget. """
+
+    chunk_budget = param_budget_bytes * (1 - STATE_BUDGET_SHARE)
+
+    return max(int(chunk_budget / (param_row_bytes * WORKING_SET_FACTOR)), 1)
+
+# -----
+
+def _peak_rss_bytes() -> int:
+    """ Return the peak resident set size of the process since the last reset. """
+
+    try:
+        with open("/proc/self/status", encoding="ascii") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+# -----
+
+def _reset_peak_rss() -> None:
+    """ Reset the peak resident set size so the next reading covers a single stage (Linux only). """
+
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+    return None
+
+# -----
+
+def _stage_memory(param_stage: str) -> dict:
+    """ Report and print the peak RSS of the stage that just ended, then reset it. """
+
+    peak_bytes = _peak_rss_bytes()
+    print(f"Mémoire {param_stage}: pic RSS {peak_bytes / 1024 ** 2:.1f} Mo")
+    _reset_peak_rss()
+
+    return {"stage": param_stage, "peak_rss_bytes": peak_bytes}
+
+# -----
+
+class _SpilledState:
+    """ De-duplication keys and signup date counts, kept in memory then spilled to SQLite past a budget. """
+
+    def __init__(self, param_spill_path: str, param_max_entries: int) -> None:
+        """ Create an empty state spilling to param_spill_path after param_max_entries entries. """
+
+        self.spill_path = param_spill_path
+        self.max_entries = max(param_max_entries, 1)
+        self.keys = set()
+        self.date_counts = {}
+        self.connection = None
+
+        return None
+
+    # -----
+
+    def _spill(self) -> None:
+        """ Move the in-memory state to the SQLite spill file. """
+
+        self.connection = sqlite3.connect(self.spill_path)
+        self.connection.execute("CREATE TABLE seen (key TEXT PRIMARY KEY) WITHOUT ROWID")
+        self.connection.execute("CREATE TABLE dates (value INTEGER PRIMARY KEY, count INTEGER NOT NULL)")
+        self.connection.executemany("INSERT INTO seen VALUES (?)", ((key,) for key in self.keys))
+        self.connection.executemany("INSERT INTO dates VALUES (?, ?)", self.date_counts.items())
+        self.keys, self.date_counts = None, None
+
+        return None
+
+    # -----
+
+    def keep_first(self, param_keys: pd.Series) -> np.ndarray:
+        """
+        Flag the rows whose key was never seen before, then remember their keys.
+
+        Args:
+            param_keys: Email keys of a chunk
+
+        Returns:
+            np.ndarray: Boolean mask of the rows to keep
+        """
+
+        keep = (~param_keys.duplicated()).to_numpy(copy=True)
+        candidates = param_keys[keep]
+
+        if self.connection is None:
+            seen = np.fromiter((key in self.keys for key in candidates), dtype=bool, count=len(candidates))
+            self.keys.update(candidates[~seen])
+        else:
+            self.connection.execute("CREATE TEMP TABLE chunk_keys (position INTEGER, key TEXT)")
+            self.connection.executemany("INSERT INTO chunk_keys VALUES (?, ?)", enumerate(candidates))
+            seen_positions = [row[0] for row in self.connection.execute(
+                "SELECT position FROM chunk_keys WHERE key IN (SELECT key FROM seen)"
+            )]
+            self.connection.execute("INSERT OR IGNORE INTO seen SELECT key FROM chunk_keys")
+            self.connection.execute("DROP TABLE chunk_keys")
+
+            seen = np.zeros(len(candidates), dtype=bool)
+            seen[seen_positions] = True
+
+        keep[np.flatnonzero(keep)[seen]] = False
+
+        if self.connection is None and len(self.keys) + len(self.date_counts) > self.max_entries:
+            self._spill()
+
+        return keep
+
+    # -----
+
+    def add_dates(self, param_date_counts: pd.Series) -> None:
+        """ Add the signup date counts of a chunk, indexed by date. """
+
+        values = param_date_counts.index.to_numpy(dtype="datetime64[ns]").view(np.int64)
+        counts = param_date_counts.to_numpy()
+
+        if self.connection is None:
+            for value, count in zip(values.tolist(), counts.tolist()):
+                self.date_counts[value] = self.date_counts.get(value, 0) + count
+        else:
+            self.connection.executemany(
+                "INSERT INTO dates VALUES (?, ?) ON CONFLICT(value) DO UPDATE SET count = count + excluded.count",
+                zip(values.tolist(), counts.tolist())
+            )
+
+        return None
+
+    # -----
+
+    def date_items(self) -> list:
+        """ Return the counted dates as [nanoseconds since epoch, count] pairs in date order. """
+
+        if self.connection is None:
+            return [list(item) for item in sorted(self.date_counts.items())]
+
+        return [list(item) for item in self.connection.execute("SELECT value, count FROM dates ORDER BY value")]
+
+    # -----
+
+    def median_date(self) -> pd.Timestamp:
+        """ Return the median of the counted dates, floored to the day, or NaT without dates. """
+
+        return median_of_date_counts(self.date_items())
+
+    # -----
+
+    def close(self) -> None:
+        """ Close the spill file if any. """
+
+        if self.connection is not None:
+            self.connection.close()
+
+        return None
+
+# -----
+
+def clean_source_with_budget(param_file_name: str, param_output_path: str, param_budget_bytes: int, param_shard: int = None, param_shards: int = None, param_checkpoint: RunCheckpoint = None, param_as_part: bool = False) -> dict:
+    """
+    Clean a raw source chunk by chunk so the process stays within a memory budget.
+    The chunk size is derived from the per-row footprint of a sample of the
+    file. Cleaned chunks are spilled to disk while the email keys and a
+    signup date histogram are accumulated (themselves spilled to SQLite when
+    they outgrow their share of the budget); a second pass fills missing dates
+    with the global median and appends each chunk to the output file.
+    The profile of the source is merged from the profiles of its chunks.
+    With a checkpoint, every cleaned chunk is a checkpointed unit: a later
+    attempt replays the completed chunks into the state and resumes reading
+    the raw file after them. When the output is a cleaned part, missing dates
+    are left to combine_cleaned_parts, the report carries the signup date
+    counts instead and rows are written with their position in the source.
+
+    Args:
+        param_file_name: Raw file name, e.g. customers_dirty2.csv
+        param_output_path: Path of the cleaned file to write, compressed according to its suffix
+        param_budget_bytes: Memory budget in bytes
+        param_shard: Index of the shard to process
+        param_shards: Total number of shards
+        param_checkpoint: Checkpoint of the source in the run, the spilled chunks are discarded when None
+        param_as_part: Whether the output is a cleaned part of the source
+
+    Returns:
+        dict: Row counts, chunk size, peak RSS of each stage and profile of the source
+    """
+
+    checkpoint = param_checkpoint or RunCheckpoint(
+        f"spill-{uuid.uuid4().hex}",
+        f"{os.path.splitext(cleaned_file_name(param_file_name))[0]}-{param_shard or 0}"
+    )
+
+    if checkpoint.completed("written") and os.path.exists(param_output_path):
+        print(f"{param_file_name}: déjà nettoyé lors d'une tentative précédente")
+        return checkpoint.info("written")
+
+    _reset_peak_rss()
+
+    raw_path = resolve_path(os.path.join(os.getcwd(), "data", "raw", param_file_name))
+    if not checkpoint.completed("plan"):
+        row_bytes = estimate_row_bytes(raw_path)
+        checkpoint.save("plan", param_info={"row_bytes": row_bytes, "chunk_rows": choose_chunk_rows(row_bytes, param_budget_bytes)})
+    row_bytes, chunk_rows = checkpoint.info("plan")["row_bytes"], checkpoint.info("plan")["chunk_rows"]
+    stages = [_stage_memory(f"{param_file_name} estimation")]
+
+    # The state is rebuilt from the completed chunks, dropping the keys of a chunk interrupted after a spill
+    state_path = os.path.join(checkpoint.directory, "state.sqlite")
+    if os.path.exists(state_path):
+        os.remove(state_path)
+    state = _SpilledState(state_path, int(param_budget_bytes * STATE_BUDGET_SHARE / _STATE_ENTRY_BYTES))
+    columns = pd.read_csv(raw_path, nrows=0, compression=compression_of(raw_path)).columns
+    rows_read, chunk_units, profiles = 0, [], []
+
+    try:
+        # First pass: clean each chunk and accumulate the whole-source state
+        while checkpoint.completed(f"chunk-{len(chunk_units):06d}"):
+            chunk_units.append(f"chunk-{len(chunk_units):06d}")
+            cleaned, date_counts = checkpoint.load(chunk_units[-1])
+            state.add_dates(date_counts)
+            state.keep_first(cleaned["email"].fillna(_MISSING_EMAIL_KEY))
+            rows_read += checkpoint.info(chunk_units[-1])["rows_read"]
+            profiles.append(checkpoint.info(chunk_units[-1])["profile"])
+
+        if chunk_units:
+            print(f"{param_file_name}: reprise après {len(chunk_units)} bloc(s)")
+
+        if not checkpoint.completed("cleaned"):
+            # Skip the header and the rows of the completed chunks
+            skipped_rows = len(chunk_units) * chunk_rows
+            chunks = pd.read_csv(
+                raw_path,
+                chunksize=chunk_rows,
+                skiprows=1 + skipped_rows,
+                header=None,
+                names=columns,
+                dtype=_TEXT_COLUMN_DTYPES,
+                compression=compression_of(raw_path)
+            )
+
+            for chunk in chunks:
+                # Index the rows by their position in the source
+                chunk.index += skipped_rows
+                chunk = select_shard(chunk, param_shard, param_shards)
+                rows_read += len(chunk)
+
+                cleaned = clean_customer_source(chunk, param_file_name, param_finalize=False)
+                date_counts = cleaned.attrs.pop("signup_date_counts")
+                state.add_dates(date_counts)
+
+                keep = state.keep_first(cleaned["email"].fillna(_MISSING_EMAIL_KEY))
+                repairs = {**cleaned.attrs["repairs"], "email_duplicate_dropped": int((~keep).sum())}
+                cleaned = cleaned[keep]
+                profiles.append(profile_input(chunk, repairs))
+
+                chunk_units.append(f"chunk-{len(chunk_units):06d}")
+                checkpoint.save(chunk_units[-1], (cleaned, date_counts), {"rows_read": len(chunk), "profile": profiles[-1]})
+
+            checkpoint.save("cleaned")
+
+        stages.append(_stage_memory(f"{param_file_name} nettoyage"))
+
+        # Second pass: fill missing dates and append the chunks to the output
+        date_items = state.date_items()
+        median_date = pd.NaT if param_as_part else median_of_date_counts(date_items)
+        rows_written = 0
+
+        with atomic_output_path(param_output_path) as temporary_path:
+            for index, unit in enumerate(chunk_units):
+                cleaned, _ = checkpoint.load(unit)
+                cleaned["signup_date"] = cleaned["signup_date"].fillna(median_date)
+                profiles.append(profile_output(cleaned))
+                if param_as_part:
+                    cleaned = cleaned.rename_axis(PART_ROW_COLUMN).reset_index()
+
+                append_csv(cleaned, temporary_path, param_header=index == 0, param_compression=compression_of(param_output_path))
+                rows_written += len(cleaned)
+
+            if not chunk_units:
+                empty = pd.DataFrame(columns=columns)
+                if param_as_part:
+                    empty.insert(0, PART_ROW_COLUMN, [])
+                append_csv(empty, temporary_path, param_header=True, param_compression=compression_of(param_output_path))
+
+        stages.append(_stage_memory(f"{param_file_name} écriture"))
+    finally:
+        state.close()
+        if param_checkpoint is None:
+            checkpoint.clear()
+
+    print(f"{param_file_name}: {rows_read - rows_written} ligne(s) supprimée(s) ({len(chunk_units)} bloc(s) de {chunk_rows} ligne(s))")
+
+    report = {
+        "rows_read": rows_read,
+        "rows_written": rows_written,
+        "row_bytes": row_bytes,
+        "chunk_rows": chunk_rows,
+        "state_spilled": state.connection is not None,
+        "stages": stages,
+        "profile": merge_profiles(*profiles)
+    }
+    if param_as_part:
+        report["signup_date_counts"] = date_items
+
+    if param_checkpoint is not None:
+        param_checkpoint.discard(chunk_units)
+        param_checkpoint.save("written", param_info=report)
+
+    return report
+
+# -----
+
+def cluster_processed_file(param_path: str, param_chunk_rows: int) -> dict:
+    """
+    Add a cluster_id column grouping near-duplicate customers to a written cleaned file.
+    Clusters are computed in one pass over the email and full name columns of
+    the whole file, so duplicates written by different chunks are linked;
+    only these two columns, not the whole source, must fit in memory. The
+    file is then rewritten chunk by chunk, its values copied as text.
+
+    Args:
+        param_path: Path of the cleaned file, compressed according to its suffix
+        param_chunk_rows: Number of rows rewritten at once
+
+    Returns:
+        dict: Peak RSS of the clustering stage
+    """
+
+    columns = pd.read_csv(param_path, nrows=0, compression=compression_of(param_path)).columns
+    identities = pd.read_csv(
+        param_path,
+        usecols=[column for column in ["full_name", "email"] if column in columns],
+        dtype="str",
+        compression=compression_of(param_path)
+    )
+    clusters = assign_duplicate_clusters(identities)["cluster_id"].to_numpy()
+    del identities
+
+    chunks = pd.read_csv(param_path, chunksize=param_chunk_rows, dtype="str", keep_default_na=False, compression=compression_of(param_path))
+    rows_written = 0
+
+    with atomic_output_path(param_path) as temporary_path:
+        for index, chunk in enumerate(chunks):
+            chunk["cluster_id"] = clusters[rows_written:rows_written + len(chunk)]
+            append_csv(chunk, temporary_path, param_header=index == 0, param_compression=compression_of(param_path))
+            rows_written += len(chunk)
+
+        if rows_written == 0:
+            empty = pd.DataFrame(columns=[*columns.drop("cluster_id", errors="ignore"), "cluster_id"])
+            append_csv(empty, temporary_path, param_header=True, param_compression=compression_of(param_path))
+
+    return _stage_memory(f"{os.path.basename(param_path)} regroupement")
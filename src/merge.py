@@ -0,0 +1,244 @@
+""" Merge cleaned customer sources into a single deduplicated golden table. """
+
+import os
+import csv
+import heapq
+import pickle
+import tempfile
+from contextlib import ExitStack
+import numpy as np
+import pandas as pd
+from src.compression import atomic_output_path, write_csv
+
+MERGE_KEY = "email"
+# Columns specific to one source that are not carried into the golden table
+EXCLUDED_COLUMNS = ["cluster_id"]
+
+# -----
+
+def _survive_rows(param_rows: pd.DataFrame, param_columns: list, param_ranks: dict) -> tuple:
+    """
+    Apply the survivorship rule to rows tagged by _tag_rows.
+    For each column, the non-null value of the highest-priority source wins.
+
+    Returns:
+        tuple: Golden rows and winning source per column, both indexed by merge key in key order
+    """
+
+    keys = pd.Index(param_rows["_merge_key"].unique(), name=MERGE_KEY).sort_values()
+    golden = pd.DataFrame(index=keys)
+    lineage = pd.DataFrame(index=keys)
+
+    for column in param_columns:
+        candidates = param_rows.loc[param_rows[column].notna(), ["_merge_key", "_source", "_order", column]]
+        candidates = candidates.assign(_rank=candidates["_source"].map(param_ranks[column]))
+        winners = candidates.sort_values(["_merge_key", "_rank", "_order"], kind="stable").drop_duplicates("_merge_key")
+        winners = winners.set_index("_merge_key")
+
+        golden[column] = winners[column].reindex(keys)
+        lineage[column] = winners["_source"].reindex(keys)
+
+    return golden, lineage
+
+# -----
+
+def _add_columns(param_columns: list, param_dataframe: pd.DataFrame) -> None:
+    """ Append the golden columns of a source that are not known yet, in source column order. """
+
+    param_columns += [column for column in param_dataframe.columns if column not in param_columns + [MERGE_KEY] + EXCLUDED_COLUMNS]
+
+    return None
+
+# -----
+
+def _survivorship_ranks(param_columns: list, param_source_names: list, param_priority: dict) -> dict:
+    """ Return the rank of every source per column, 0 for the highest priority. """
+
+    ranks = {}
+    for column in param_columns:
+        priority = (param_priority or {}).get(column, param_source_names)
+        unknown = [name for name in priority if name not in param_source_names]
+        if unknown:
+            raise ValueError(f"Unknown source(s) {unknown} in priority of column '{column}'.")
+
+        ordered = list(priority) + [name for name in param_source_names if name not in priority]
+        ranks[column] = {name: rank for rank, name in enumerate(ordered)}
+
+    return ranks
+
+# -----
+
+def _tag_rows(param_dataframe: pd.DataFrame, param_source: str, param_first_order: int) -> pd.DataFrame:
+    """ Tag the rows of a source with their source, normalized merge key and global order, dropping rows without key. """
+
+    tagged = param_dataframe.assign(
+        _source=param_source,
+        _merge_key=param_dataframe[MERGE_KEY].str.strip().str.lower(),
+        _order=np.arange(param_first_order, param_first_order + len(param_dataframe))
+    )
+
+    return tagged[tagged["_merge_key"].notna() & (tagged["_merge_key"] != "")]
+
+# -----
+
+def merge_customers_data(param_sources: dict, param_priority: dict = None) -> tuple:
+    """
+    Merge cleaned customer sources into one golden table keyed by email.
+    A priority-based survivorship rule picks the value of every column in a
+    single vectorized pass over all the sources held in memory; see
+    merge_customers_files for sources that do not fit in memory.
+
+    Args:
+        param_sources: Cleaned dataframes keyed by source name
+        param_priority: Source names in priority order per column; columns not
+            listed follow the order of param_sources
+
+    Returns:
+        tuple: Golden dataframe and lineage dataframe giving the winning source of each field
+    """
+
+    columns = []
+    for dataframe in param_sources.values():
+        _add_columns(columns, dataframe)
+    ranks = _survivorship_ranks(columns, list(param_sources), param_priority)
+
+    tagged, order = [], 0
+    for name, dataframe in param_sources.items():
+        tagged.append(_tag_rows(dataframe, name, order))
+        order += len(dataframe)
+
+    if not tagged:
+        return pd.DataFrame(columns=[MERGE_KEY] + columns), pd.DataFrame(columns=[MERGE_KEY] + columns)
+
+    golden, lineage = _survive_rows(pd.concat(tagged, ignore_index=True), columns, ranks)
+
+    return golden.reset_index(), lineage.reset_index()
+
+# -----
+
+def _read_spilled(param_path: str) -> list:
+    """ Read back the frames appended to a spill file by merge_customers_files. """
+
+    frames = []
+    with open(param_path, "rb") as file:
+        while True:
+            try:
+                frames.append(pickle.load(file))
+            except EOFError:
+                return frames
+
+# -----
+
+def merge_customers_files(param_sources: dict, param_priority: dict = None, param_partitions: int = 8) -> int:
+    """
+    Merge cleaned customer sources read in chunks into the golden table files, out of core.
+    Rows are hash-partitioned on the normalized email into spill files, so
+    every customer falls in a single partition; partitions are then merged
+    one at a time with the same survivorship rule as merge_customers_data,
+    and their key-ordered outputs are merged into customers_golden.csv and
+    customers_golden_lineage.csv. Only one partition is held in memory.
+
+    Args:
+        param_sources: Iterables of cleaned dataframe chunks keyed by source name
+        param_priority: Source names in priority order per column; columns not
+            listed follow the order of param_sources
+        param_partitions: Number of hash partitions
+
+    Returns:
+        int: Number of golden customers
+    """
+
+    processed_dir = os.path.join(os.getcwd(), "data", "processed")
+    columns, order = [], 0
+
+    with tempfile.TemporaryDirectory(prefix=".merge-", dir=processed_dir) as spill_dir:
+        spill_paths = [os.path.join(spill_dir, f"partition-{partition}.pkl") for partition in range(param_partitions)]
+
+        with ExitStack() as stack:
+            spills = [stack.enter_context(open(path, "wb")) for path in spill_paths]
+
+            for name, chunks in param_sources.items():
+                for chunk in chunks:
+                    _add_columns(columns, chunk)
+                    tagged = _tag_rows(chunk, name, order)
+                    order += len(chunk)
+
+                    partition_ids = pd.util.hash_pandas_object(tagged["_merge_key"], index=False).to_numpy() % np.uint64(param_partitions)
+                    for partition, rows in tagged.groupby(partition_ids, sort=False):
+                        pickle.dump(rows, spills[partition], protocol=pickle.HIGHEST_PROTOCOL)
+
+        ranks = _survivorship_ranks(columns, list(param_sources), param_priority)
+
+        outputs, customers = {"golden": [], "lineage": []}, 0
+        for partition, spill_path in enumerate(spill_paths):
+            frames = _read_spilled(spill_path)
+            os.remove(spill_path)
+            if not frames:
+                continue
+
+            golden, lineage = _survive_rows(pd.concat(frames, ignore_index=True), columns, ranks)
+            customers += len(golden)
+
+            for kind, dataframe in [("golden", golden), ("lineage", lineage)]:
+                outputs[kind].append(os.path.join(spill_dir, f"{kind}-{partition}.csv"))
+                dataframe.reset_index().to_csv(outputs[kind][-1], index=False, header=False)
+
+        # Partitions are key-ordered, a k-way merge gives the key order of merge_customers_data
+        for kind, file_name in [("golden", "customers_golden.csv"), ("lineage", "customers_golden_lineage.csv")]:
+            with ExitStack() as stack:
+                readers = [csv.reader(stack.enter_context(open(path, encoding="utf-8", newline=""))) for path in outputs[kind]]
+                temporary_path = stack.enter_context(atomic_output_path(os.path.join(processed_dir, file_name)))
+                writer = csv.writer(stack.enter_context(open(temporary_path, "w", encoding="utf-8", newline="")), lineterminator="\n")
+
+                writer.writerow([MERGE_KEY] + columns)
+                writer.writerows(heapq.merge(*readers, key=lambda row: row[0]))
+
+    print(f"Table fusionnée: {customers} client(s) unique(s)")
+
+    return customers
+
+# -----
+
+def save_merged_data(param_golden: pd.DataFrame, param_lineage: pd.DataFrame) -> None:
+    """
+    Save the golden customers table and its lineage to processed CSV files.
+
+    Args:
+        param_golden: Golden customers dataframe
+        param_lineage: Winning source of each golden field
+    """
+
+    write_csv(
+        param_golden,
+        os.path.join(
+            os.getcwd(),
+            "data",
+            "processed",
+            "customers_golden.csv"
+        )
+    )
+    write_csv(
+        param_lineage,
+        os.path.join(
+            os.getcwd(),
+            "data",
+            "processed",
+            "customers_golden_lineage.csv"
+        )
+    )
+    print(f"Table fusionnée: {len(param_golden)} client(s) unique(s)")
+
+    return None
+
+# -----
+
+def remove_golden_files() -> None:
+    """ Remove the golden customers table and its lineage, when they can no longer be rebuilt from the processed files. """
+
+    for file_name in ["customers_golden.csv", "customers_golden_lineage.csv"]:
+        path = os.path.join(os.getcwd(), "data", "processed", file_name)
+        if os.path.exists(path):
+            os.remove(path)
+            print(f"{file_name}: supprimé car périmé")
+
+    return None
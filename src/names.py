@@ -0,0 +1,65 @@
+""" Tokenize customer full names once for the email repair and full name checks. """
+
+import pandas as pd
+
+# Letters that NFKD normalization does not decompose into an ASCII letter
+_TRANSLITERATIONS = str.maketrans({
+    "ß": "ss",
+    "æ": "ae",
+    "Æ": "AE",
+    "œ": "oe",
+    "Œ": "OE",
+    "ø": "o",
+    "Ø": "O",
+    "ł": "l",
+    "Ł": "L",
+    "đ": "d",
+    "Đ": "D"
+})
+
+# -----
+
+def split_full_name(param_full_name: pd.Series) -> pd.DataFrame:
+    """
+    Split full names into first and last names in a single pass.
+    The first token is the first name and the remaining tokens form the last
+    name, so "Ahmed Ben Ali" gives "Ahmed" and "Ben Ali". Names with a single
+    token, blank or missing have no last name.
+
+    Args:
+        param_full_name: Full name column
+
+    Returns:
+        pd.DataFrame: first_name and last_name columns, on the index of param_full_name
+    """
+
+    names = param_full_name.astype("str").str.split(n=1, expand=True).reindex(columns=[0, 1])
+    names.columns = ["first_name", "last_name"]
+    names = names.astype("str")
+    names["last_name"] = names["last_name"].str.rstrip()
+
+    return names
+
+# -----
+
+def email_local_part(param_names: pd.DataFrame) -> pd.Series:
+    """
+    Build the first.last email local part of tokenized names.
+    Accents are removed and the tokens of a multi-token last name are joined,
+    e.g. "pedro.garcia" for Pedro García and "ahmed.benali" for Ahmed Ben Ali.
+
+    Args:
+        param_names: first_name and last_name columns from split_full_name
+
+    Returns:
+        pd.Series: Lowercase ASCII local parts, missing without a last name
+    """
+
+    local_part = param_names["first_name"] + "." + param_names["last_name"]
+
+    return (
+        local_part.str.translate(_TRANSLITERATIONS)
+        .str.normalize("NFKD").str.encode("ascii", errors="ignore").str.decode("ascii")
+        .str.lower()
+        .str.replace(r"[^a-z0-9.-]", "", regex=True)
+    )
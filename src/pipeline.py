@@ -1,21 +1,494 @@
 """ File for running the full data processing pipeline. """
 
-from src.load_data import load_customers_data
-from src.clean_data import clean_customers_data, save_cleaned_data
+import os
+import queue
+import argparse
+import traceback
+import multiprocessing
+from src.checkpoint import RunCheckpoint, raw_file_fingerprint
+from src.load_data import load_customer_source
+from src.clean_data import save_cleaned_data, save_cleaned_source, clean_customer_source, save_cleaned_part, save_part_date_counts, combine_cleaned_parts, clear_cleaned_parts, cleaned_file_name, cleaned_part_path, processed_file_path, remove_stale_variants
+from src.compression import strip_compression_suffix
+from src.entity_resolution import assign_duplicate_clusters
+from src.lookup_index import refresh_lookup_indexes
+from src.memory_budget import WORKING_SET_FACTOR, clean_source_with_budget, cluster_processed_file, parse_memory_size
+from src.merge import merge_customers_data, merge_customers_files, remove_golden_files, save_merged_data
+from src.profiling import profile_source, record_run_profiles, save_part_profile
+from src.shared_frames import attach_dataframe, discard_handle, share_dataframe
+from src.validation import iter_processed_data, load_processed_data, validate_customers_chunks, validate_customers_data
+
+RAW_FILES = ["customers_dirty.csv", "customers_dirty2.csv", "customers_dirty3.csv"]
+
+# Seconds to wait for a stage process before checking it is still alive
+STAGE_POLL_SECONDS = 1
+
+# -----
+
+def _run_stage(param_checkpoint: RunCheckpoint, param_unit: str, param_function, *param_args):
+    """ Run a stage of the pipeline, or return its result when a previous attempt of the run completed it. """
+
+    if param_checkpoint is not None and param_checkpoint.completed(param_unit):
+        print(f"Étape {param_unit}: reprise depuis le point de contrôle")
+        return param_checkpoint.load(param_unit)
+
+    result = param_function(*param_args)
+
+    if param_checkpoint is not None:
+        param_checkpoint.save(param_unit, result)
+
+    return result
+
+# -----
+
+def _load_and_clean(param_file_name: str, param_shard: int = None, param_shards: int = None) -> tuple:
+    """
+    Load and clean a single raw source, or a shard of it, and profile it.
+    Missing signup dates of a shard are left for the merge to fill with the
+    median of the whole source.
+    """
+
+    raw = load_customer_source(param_file_name, param_shard, param_shards)
+    cleaned = clean_customer_source(raw, param_file_name, param_fill_dates=param_shards is None)
+
+    return cleaned, profile_source(raw, cleaned)
+
+# -----
+
+def _merge_and_save(param_sources: dict) -> None:
+    """ Build the golden table from the cleaned sources and save it. """
+
+    golden, lineage = merge_customers_data(param_sources)
+    save_merged_data(golden, lineage)
+
+    return None
 
 # -----
 
-def run_pipeline():
-    """ Run the data processing pipeline: load, clean, and save customer data. """
+def run_pipeline(param_compression: str = None, param_run_id: str = None, param_clusters: bool = False):
+    """
+    Run the data processing pipeline: load, clean, save and merge customer data.
+    With param_clusters, a cluster_id column grouping near-duplicate customers
+    is added to the cleaned sources before they are saved.
+    The profile of each source is persisted and compared with the previous run.
+    With a run id, the cleaned sources and the completed stages are
+    checkpointed, so a retry of the run resumes after the last completed one.
+    """
 
-    df1, df2, df3 = load_customers_data()
-    df1, df2, df3 = clean_customers_data(df1, df2, df3)
-    save_cleaned_data(df1, df2, df3)
+    checkpoint = None
+    if param_run_id:
+        checkpoint = RunCheckpoint(param_run_id, "pipeline", {
+            "sources": [raw_file_fingerprint(file_name) for file_name in RAW_FILES],
+            "compression": param_compression,
+            "clusters": param_clusters
+        })
+
+    cleaned = {file_name: _run_stage(checkpoint, f"clean-{file_name}", _load_and_clean, file_name) for file_name in RAW_FILES}
+    df1, df2, df3 = [dataframe for dataframe, _ in cleaned.values()]
+    if param_clusters:
+        df1, df2, df3 = [assign_duplicate_clusters(dataframe) for dataframe in [df1, df2, df3]]
+
+    _run_stage(checkpoint, "save", save_cleaned_data, df1, df2, df3, param_compression)
+    _run_stage(checkpoint, "profile", record_run_profiles, {
+        cleaned_file_name(file_name): profile for file_name, (_, profile) in cleaned.items()
+    }, param_run_id)
+    _run_stage(checkpoint, "merge", _merge_and_save, {
+        "customers_cleaned": df1,
+        "customers_cleaned2": df2,
+        "customers_cleaned3": df3
+    })
+
+    if checkpoint is not None:
+        checkpoint.clear()
 
     return df1, df2, df3
 
 # -----
 
+def _hand_over(param_queue: multiprocessing.Queue, param_message: tuple, param_stop: multiprocessing.Event) -> bool:
+    """ Put a message for the next stage, or discard its shared dataframe once the run is stopping. """
+
+    while not param_stop.is_set():
+        try:
+            param_queue.put(param_message, timeout=STAGE_POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+
+    if param_message[1] is not None:
+        discard_handle(param_message[1])
+
+    return False
+
+# -----
+
+def _load_stage(param_file_names: list, param_output: multiprocessing.Queue, param_stop: multiprocessing.Event) -> None:
+    """ Load each raw source and hand it to the clean stage through shared memory. """
+
+    for file_name in param_file_names:
+        try:
+            message = (file_name, share_dataframe(load_customer_source(file_name)), None)
+        except Exception:
+            param_output.put((file_name, None, traceback.format_exc()))
+            return None
+
+        if not _hand_over(param_output, message, param_stop):
+            return None
+
+    param_output.put(None)
+
+    return None
+
+# -----
+
+def _clean_stage(param_input: multiprocessing.Queue, param_output: multiprocessing.Queue, param_stop: multiprocessing.Event, param_clusters: bool = False) -> None:
+    """ Clean, profile and optionally cluster each loaded source and hand it back to the parent process through shared memory. """
+
+    while (message := param_input.get()) is not None:
+        file_name, handle, error = message
+        if error is not None:
+            param_output.put(message)
+            return None
+
+        try:
+            raw = attach_dataframe(handle)
+            cleaned = clean_customer_source(raw, file_name)
+            cleaned.attrs["profile"] = profile_source(raw, cleaned)
+            if param_clusters:
+                cleaned = assign_duplicate_clusters(cleaned)
+            message = (file_name, share_dataframe(cleaned), None)
+        except Exception:
+            param_output.put((file_name, None, traceback.format_exc()))
+            return None
+
+        if not _hand_over(param_output, message, param_stop):
+            return None
+
+    param_output.put(None)
+
+    return None
+
+# -----
+
+def _next_stage_message(param_queue: multiprocessing.Queue, param_processes: list):
+    """ Wait for the next message of a stage, failing instead of hanging when a stage process died. """
+
+    while True:
+        try:
+            return param_queue.get(timeout=STAGE_POLL_SECONDS)
+        except queue.Empty:
+            if any(process.exitcode not in (None, 0) for process in param_processes) or not any(process.is_alive() for process in param_processes):
+                raise RuntimeError(f"Processus d'étape arrêté: {[(process.name, process.exitcode) for process in param_processes]}")
+
+# -----
+
+def run_pipeline_pipelined(param_compression: str = None, param_run_id: str = None, param_clusters: bool = False):
+    """
+    Run the pipeline with the load and clean stages in separate processes.
+    Sources flow through the stages one after the other, so a source is
+    cleaned while the next one is loaded, and saved by this process as soon
+    as it is cleaned. Dataframes are handed over through shared memory: their
+    NumPy columns are copied once into a block instead of through the
+    queues, while string columns are still pickled, into the same block.
+    The stage processes are not daemonic, since clustering may start its own
+    worker processes. The profiles are recorded and the golden table built
+    as in run_pipeline, without checkpoints.
+
+    Args:
+        param_compression: Output compression, "gzip" or "zstd", None for plain CSV
+        param_run_id: Identifier of the run the profiles are recorded under, a timestamp when None
+        param_clusters: Whether the clean stage adds a cluster_id column grouping near-duplicate customers
+
+    Returns:
+        tuple: Cleaned dataframes, in the order of RAW_FILES
+    """
+
+    loaded, cleaned, stop = multiprocessing.Queue(maxsize=1), multiprocessing.Queue(), multiprocessing.Event()
+    processes = [
+        multiprocessing.Process(target=_load_stage, args=(RAW_FILES, loaded, stop), name="load"),
+        multiprocessing.Process(target=_clean_stage, args=(loaded, cleaned, stop, param_clusters), name="clean")
+    ]
+    for process in processes:
+        process.start()
+
+    sources = {}
+    try:
+        while len(sources) < len(RAW_FILES):
+            message = _next_stage_message(cleaned, processes)
+            if message is None:
+                raise RuntimeError("Étape de nettoyage terminée avant la fin des sources")
+
+            file_name, handle, error = message
+            if error is not None:
+                raise RuntimeError(f"Échec de l'étape pour {file_name}:\n{error}")
+
+            sources[file_name] = attach_dataframe(handle)
+            save_cleaned_source(sources[file_name], file_name, param_compression)
+    finally:
+        # Stages blocked on a full queue discard the dataframe they hold and return
+        stop.set()
+        for process in processes:
+            process.join(timeout=2 * STAGE_POLL_SECONDS)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+
+        for stage_queue in [loaded, cleaned]:
+            while True:
+                try:
+                    message = stage_queue.get_nowait()
+                except (queue.Empty, OSError, ValueError):
+                    break
+                if message is not None and message[1] is not None:
+                    discard_handle(message[1])
+
+    df1, df2, df3 = [sources[file_name] for file_name in RAW_FILES]
+    profiles = {cleaned_file_name(file_name): sources[file_name].attrs.pop("profile") for file_name in RAW_FILES}
+
+    refresh_lookup_indexes(os.path.join(os.getcwd(), "data", "processed"))
+    record_run_profiles(profiles, param_run_id)
+    _merge_and_save({
+        "customers_cleaned": df1,
+        "customers_cleaned2": df2,
+        "customers_cleaned3": df3
+    })
+
+    return df1, df2, df3
+
+# -----
+
+def run_pipeline_with_budget(param_budget_bytes: int, param_compression: str = None, param_run_id: str = None, param_clusters: bool = False) -> dict:
+    """
+    Run the pipeline within a memory budget: each source is cleaned in chunks
+    sized from a sample of its rows and its profile is recorded. With
+    param_clusters, near-duplicate clusters are then computed in one pass over
+    the email and name columns of each whole cleaned source. The processed
+    files are then checked chunk by chunk, and the golden table is built if
+    the cleaned sources are estimated to fit in the budget. Otherwise the
+    golden table of a previous run is removed rather than left out of date.
+    With a run id, the chunks and cleaned sources are checkpointed until the
+    whole run succeeded.
+
+    Args:
+        param_budget_bytes: Memory budget in bytes
+        param_compression: Output compression, "gzip" or "zstd", None for plain CSV
+        param_run_id: Identifier shared by the attempts of the run, no checkpoint when None
+        param_clusters: Whether to add a cluster_id column grouping near-duplicate customers
+
+    Returns:
+        dict: Chunking and peak RSS report per raw file name
+    """
+
+    reports, checkpoints = {}, []
+    for file_name in RAW_FILES:
+        if param_run_id:
+            checkpoints.append(RunCheckpoint(param_run_id, os.path.splitext(cleaned_file_name(file_name))[0], {
+                "source": raw_file_fingerprint(file_name),
+                "budget": param_budget_bytes,
+                "compression": param_compression
+            }))
+
+        output_path = processed_file_path(cleaned_file_name(file_name), param_compression)
+        reports[file_name] = clean_source_with_budget(file_name, output_path, param_budget_bytes, param_checkpoint=checkpoints[-1] if checkpoints else None)
+        if param_clusters:
+            reports[file_name]["stages"].append(cluster_processed_file(output_path, reports[file_name]["chunk_rows"]))
+        remove_stale_variants(output_path)
+
+    refresh_lookup_indexes(os.path.join(os.getcwd(), "data", "processed"))
+    record_run_profiles({cleaned_file_name(file_name): report["profile"] for file_name, report in reports.items()}, param_run_id)
+
+    paths = _processed_paths()
+    _check_processed(paths, param_chunked=True)
+
+    merge_bytes = sum(report["rows_written"] * report["row_bytes"] * WORKING_SET_FACTOR for report in reports.values())
+    if merge_bytes > param_budget_bytes:
+        print(f"Fusion ignorée: {merge_bytes / 1024 ** 2:.0f} Mo estimés pour un budget de {param_budget_bytes / 1024 ** 2:.0f} Mo")
+        remove_golden_files()
+    else:
+        merge_customers_files({
+            os.path.splitext(name)[0]: iter_processed_data(path) for name, path in paths.items()
+        })
+
+    for checkpoint in checkpoints:
+        checkpoint.clear()
+
+    return reports
+
+# -----
+
+def run_source(param_file_name: str, param_shard: int = 0, param_shards: int = 1, param_budget_bytes: int = None, param_run_id: str = None) -> str:
+    """
+    Load, clean and save a single raw source, or a single shard of it.
+    Missing signup dates are filled by the merge, with the median of the
+    whole source. When cleaned in chunks with a run id, a retry resumes after
+    the last checkpointed chunk.
+
+    Args:
+        param_file_name: Raw file name, e.g. customers_dirty2.csv
+        param_shard: Index of the shard to process
+        param_shards: Total number of shards
+        param_budget_bytes: Memory budget in bytes, the source is cleaned in chunks when set
+        param_run_id: Identifier shared by the attempts of the run, no checkpoint when None
+
+    Returns:
+        str: Path of the written cleaned part
+    """
+
+    if not 0 <= param_shard < param_shards:
+        raise ValueError(f"Invalid shard {param_shard} for {param_shards} shard(s).")
+
+    if param_budget_bytes:
+        part_path = cleaned_part_path(param_file_name, param_shard, param_shards)
+
+        checkpoint = None
+        if param_run_id:
+            checkpoint = RunCheckpoint(param_run_id, f"{os.path.splitext(cleaned_file_name(param_file_name))[0]}-{param_shard}-of-{param_shards}", {
+                "source": raw_file_fingerprint(param_file_name),
+                "budget": param_budget_bytes
+            })
+
+        report = clean_source_with_budget(param_file_name, part_path, param_budget_bytes, param_shard, param_shards, checkpoint, param_as_part=True)
+        save_part_profile(part_path, report["profile"])
+        save_part_date_counts(part_path, report["signup_date_counts"])
+
+        if checkpoint is not None:
+            checkpoint.clear()
+
+        return part_path
+
+    dataframe, profile = _load_and_clean(param_file_name, param_shard, param_shards)
+    part_path = save_cleaned_part(dataframe, param_file_name, param_shard, param_shards)
+    save_part_profile(part_path, profile)
+
+    return part_path
+
+# -----
+
+def run_merge(param_compression: str = None, param_run_id: str = None, param_clusters: bool = False) -> dict:
+    """
+    Combine the cleaned parts, record the profiles merged from theirs, check
+    data quality and build the golden table.
+    Fails when any processed file violates a data quality constraint. The
+    parts are removed once merged, so a later merge never combines the parts
+    of a previous run.
+
+    Args:
+        param_compression: Compression of the combined files, "gzip" or "zstd", None for plain CSV
+        param_run_id: Identifier of the run the profiles are recorded under, a timestamp when None
+        param_clusters: Whether to add a cluster_id column grouping near-duplicate customers to the combined files
+
+    Returns:
+        dict: Quality report per processed file name
+    """
+
+    combined = combine_cleaned_parts(param_compression, param_clusters)
+
+    profiles = {name: dataframe.attrs["profile"] for name, dataframe in combined.items() if "profile" in dataframe.attrs}
+    if profiles:
+        record_run_profiles(profiles, param_run_id)
+
+    reports = _check_and_merge_processed()
+    clear_cleaned_parts()
+
+    return reports
+
+# -----
+
+def _processed_paths() -> dict:
+    """ Return the paths of the processed files, plain or compressed, keyed by plain file name. """
+
+    processed_dir = os.path.join(os.getcwd(), "data", "processed")
+
+    return {
+        strip_compression_suffix(name): os.path.join(processed_dir, name)
+        for name in sorted(os.listdir(processed_dir))
+        if name.startswith("customers_cleaned") and strip_compression_suffix(name).endswith(".csv")
+    }
+
+# -----
+
+def _check_processed(param_paths: dict, param_chunked: bool = False) -> dict:
+    """
+    Check the quality of the processed files, one at a time, read in chunks
+    with param_chunked. Fails when any file violates a data quality constraint.
+    """
+
+    if param_chunked:
+        reports = {name: validate_customers_chunks(iter_processed_data(path)) for name, path in param_paths.items()}
+    else:
+        reports = {name: validate_customers_data(load_processed_data(path)) for name, path in param_paths.items()}
+
+    failed = {name: report for name, report in reports.items() if not report["valid"]}
+    if failed:
+        raise ValueError(f"Data quality check failed: {failed}")
+
+    return reports
+
+# -----
+
+def _check_and_merge_processed() -> dict:
+    """
+    Check the quality of the processed files, one at a time, and build the
+    golden table from them out of core.
+    """
+
+    paths = _processed_paths()
+    reports = _check_processed(paths)
+
+    merge_customers_files({
+        os.path.splitext(name)[0]: iter_processed_data(path) for name, path in paths.items()
+    })
+
+    return reports
+
+# -----
+
+def main(param_args: list = None) -> None:
+    """
+    Command line entry point.
+    Without arguments the full pipeline runs; --source runs a single source
+    (or shard with --shard/--shards) and --merge runs the final merge and
+    quality check over the cleaned parts. Attempts of a run sharing a
+    --run-id resume from its checkpoints. --pipelined loads and cleans sources
+    in separate processes sharing memory, saving each one once cleaned.
+    --clusters adds the near-duplicate cluster_id column, to the whole sources
+    of a full run (in one pass over their identity columns under a memory
+    budget) or at the merge of shards.
+    """
+
+    parser = argparse.ArgumentParser(description="Customers data pipeline.")
+    parser.add_argument("--source", help="Raw file name to process, e.g. customers_dirty2.csv")
+    parser.add_argument("--shard", type=int, default=0, help="Index of the shard to process")
+    parser.add_argument("--shards", type=int, default=1, help="Total number of shards of the source")
+    parser.add_argument("--merge", action="store_true", help="Combine cleaned parts, check quality and merge sources")
+    parser.add_argument("--compression", choices=["gzip", "zstd"], help="Compression of the processed files, written in blocks of 4 MiB so a customer lookup decompresses a single block")
+    parser.add_argument("--memory-budget", type=parse_memory_size, help="Memory budget, e.g. 512M, to clean sources in chunks; with --clusters, the email and name columns of a whole source must also fit in it")
+    parser.add_argument("--run-id", help="Identifier shared by the attempts of a run, to resume from its checkpoints")
+    parser.add_argument("--pipelined", action="store_true", help="Load and clean sources in separate processes, saving each one once cleaned")
+    parser.add_argument("--clusters", action="store_true", help="Add a cluster_id column grouping near-duplicate customers, computed on whole sources (at --merge for shards)")
+    args = parser.parse_args(param_args)
+
+    if args.source and args.merge:
+        parser.error("--source and --merge cannot be used together.")
+    if args.pipelined and (args.source or args.merge or args.memory_budget):
+        parser.error("--pipelined cannot be used with --source, --merge or --memory-budget.")
+    if args.clusters and args.source:
+        parser.error("--clusters cannot be used with --source, clusters of shards are computed by --merge.")
+
+    if args.source:
+        run_source(args.source, args.shard, args.shards, args.memory_budget, args.run_id)
+    elif args.merge:
+        run_merge(args.compression, args.run_id, args.clusters)
+    elif args.memory_budget:
+        run_pipeline_with_budget(args.memory_budget, args.compression, args.run_id, args.clusters)
+    elif args.pipelined:
+        run_pipeline_pipelined(args.compression, args.run_id, args.clusters)
+    else:
+        run_pipeline(args.compression, args.run_id, args.clusters)
+
+    return None
+
+# -----
+
 if __name__ == "__main__":
 
-    run_pipeline()
+    main()
@@ -0,0 +1,385 @@
+""" Profile customer sources with mergeable sketches and detect drift between pipeline runs. """
+
+import os
+import json
+import math
+import base64
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from src.checkpoint import safe_file_name
+from src.compression import atomic_output_path
+
+# Columns whose value distribution is tracked
+HISTOGRAM_COLUMNS = ["country", "loyalty_tier"]
+# Columns whose distinct values are counted approximately
+DISTINCT_COLUMNS = ["customer_id", "email"]
+# Number of HyperLogLog register index bits: 4096 registers, about 1.6% standard error
+HLL_PRECISION = 12
+# Relative accuracy of the purchase amount quantiles
+AMOUNT_RELATIVE_ACCURACY = 0.01
+AMOUNT_QUANTILES = [0.5, 0.9, 0.99]
+# A metric drifts when it changes by this factor, either way, and by at least the minimum delta
+DRIFT_RATIO = 2.0
+DRIFT_MIN_DELTA = 0.01
+# Suffix of the profile saved next to a cleaned part
+PART_PROFILE_SUFFIX = ".profile.json"
+
+_AMOUNT_GAMMA = (1 + AMOUNT_RELATIVE_ACCURACY) / (1 - AMOUNT_RELATIVE_ACCURACY)
+
+# -----
+
+def _leading_zeros(param_words: np.ndarray) -> np.ndarray:
+    """ Count the leading zero bits of 64-bit words. """
+
+    words = param_words.copy()
+    zeros = np.zeros(len(words), dtype=np.uint8)
+
+    for shift in [32, 16, 8, 4, 2, 1]:
+        mask = (words >> np.uint64(64 - shift)) == 0
+        zeros[mask] += shift
+        words[mask] <<= np.uint64(shift)
+
+    zeros[words == 0] += 1
+
+    return zeros
+
+# -----
+
+def _hll_registers(param_values: pd.Series) -> np.ndarray:
+    """ Build the HyperLogLog registers of the non-missing values of a column. """
+
+    hashes = pd.util.hash_pandas_object(param_values.dropna(), index=False).to_numpy()
+
+    index = hashes >> np.uint64(64 - HLL_PRECISION)
+    rank = np.minimum(_leading_zeros(hashes << np.uint64(HLL_PRECISION)) + 1, 64 - HLL_PRECISION + 1)
+
+    registers = np.zeros(1 << HLL_PRECISION, dtype=np.uint8)
+    np.maximum.at(registers, index.astype(np.intp), rank.astype(np.uint8))
+
+    return registers
+
+# -----
+
+def _encode_registers(param_registers: np.ndarray) -> str:
+    """ Encode HyperLogLog registers for JSON. """
+
+    return base64.b64encode(param_registers.tobytes()).decode("ascii")
+
+# -----
+
+def _decode_registers(param_encoded: str) -> np.ndarray:
+    """ Decode HyperLogLog registers from JSON. """
+
+    return np.frombuffer(base64.b64decode(param_encoded), dtype=np.uint8)
+
+# -----
+
+def estimate_distinct(param_encoded: str) -> float:
+    """ Estimate the number of distinct values from encoded HyperLogLog registers. """
+
+    registers = _decode_registers(param_encoded).astype(np.float64)
+    size = len(registers)
+
+    estimate = 0.7213 / (1 + 1.079 / size) * size ** 2 / np.sum(2.0 ** -registers)
+    empty = int(np.count_nonzero(registers == 0))
+
+    # Linear counting is more accurate for small cardinalities
+    if estimate <= 2.5 * size and empty:
+        estimate = size * math.log(size / empty)
+
+    return float(estimate)
+
+# -----
+
+def _amount_buckets(param_amounts: pd.Series) -> dict:
+    """ Count positive amounts per logarithmic bucket, zero and negative amounts in the "zero" bucket. """
+
+    amounts = param_amounts.dropna().to_numpy(dtype=np.float64)
+    positive = amounts[amounts > 0]
+
+    keys, counts = np.unique(np.ceil(np.log(positive) / math.log(_AMOUNT_GAMMA)).astype(np.int64), return_counts=True)
+    buckets = {str(key): int(count) for key, count in zip(keys.tolist(), counts.tolist())}
+
+    if len(positive) < len(amounts):
+        buckets["zero"] = len(amounts) - len(positive)
+
+    return buckets
+
+# -----
+
+def amount_quantile(param_buckets: dict, param_quantile: float) -> float:
+    """ Return an amount quantile, within the relative accuracy, from amount buckets. """
+
+    zero = param_buckets.get("zero", 0)
+    keys = sorted(int(key) for key in param_buckets if key != "zero")
+    total = zero + sum(param_buckets[str(key)] for key in keys)
+
+    if not total:
+        return float("nan")
+
+    rank = param_quantile * (total - 1)
+    if rank < zero:
+        return 0.0
+
+    cumulative = zero
+    for key in keys:
+        cumulative += param_buckets[str(key)]
+        if rank < cumulative:
+            return 2 * _AMOUNT_GAMMA ** key / (_AMOUNT_GAMMA + 1)
+
+    return 2 * _AMOUNT_GAMMA ** keys[-1] / (_AMOUNT_GAMMA + 1)
+
+# -----
+
+def profile_input(param_raw: pd.DataFrame, param_repairs: dict = None) -> dict:
+    """
+    Profile the raw rows of a source, or of a chunk or shard of it.
+
+    Args:
+        param_raw: Raw customers dataframe
+        param_repairs: Per-rule repair counts of the cleaning of these rows
+
+    Returns:
+        dict: Mergeable profile with the input row count, null counts per column and repair counts
+    """
+
+    return {
+        "rows_in": len(param_raw),
+        "nulls": {column: int(count) for column, count in param_raw.isna().sum().items()},
+        "repairs": dict(param_repairs or {})
+    }
+
+# -----
+
+def profile_output(param_cleaned: pd.DataFrame) -> dict:
+    """
+    Profile the cleaned rows of a source, or of a chunk or shard of it.
+
+    Args:
+        param_cleaned: Cleaned customers dataframe
+
+    Returns:
+        dict: Mergeable profile with the output row count, value histograms,
+            HyperLogLog registers and purchase amount buckets
+    """
+
+    columns = param_cleaned.columns
+
+    return {
+        "rows_out": len(param_cleaned),
+        "histograms": {
+            column: {str(value): int(count) for value, count in param_cleaned[column].value_counts().items()}
+            for column in HISTOGRAM_COLUMNS if column in columns
+        },
+        "distinct": {
+            column: _encode_registers(_hll_registers(param_cleaned[column]))
+            for column in DISTINCT_COLUMNS if column in columns
+        },
+        "amount_buckets": _amount_buckets(param_cleaned["last_purchase_amount"]) if "last_purchase_amount" in columns else {}
+    }
+
+# -----
+
+def profile_source(param_raw: pd.DataFrame, param_cleaned: pd.DataFrame) -> dict:
+    """ Profile a source from its raw rows and its cleaned rows, with the repair counts of their cleaning. """
+
+    return merge_profiles(
+        profile_input(param_raw, param_cleaned.attrs.get("repairs")),
+        profile_output(param_cleaned)
+    )
+
+# -----
+
+def _add_counts(param_left: dict, param_right: dict) -> dict:
+    """ Add two count dictionaries. """
+
+    merged = dict(param_left)
+    for key, count in param_right.items():
+        merged[key] = merged.get(key, 0) + count
+
+    return merged
+
+# -----
+
+def merge_profiles(*param_profiles: dict) -> dict:
+    """
+    Merge partial profiles, e.g. of the chunks or shards of a source.
+    Counts and histograms are added and HyperLogLog registers combined by
+    maximum, so merging gives the profile of the concatenated rows.
+
+    Returns:
+        dict: Merged profile
+    """
+
+    merged = {"rows_in": 0, "rows_out": 0, "nulls": {}, "repairs": {}, "histograms": {}, "distinct": {}, "amount_buckets": {}}
+
+    for profile in param_profiles:
+        merged["rows_in"] += profile.get("rows_in", 0)
+        merged["rows_out"] += profile.get("rows_out", 0)
+        merged["nulls"] = _add_counts(merged["nulls"], profile.get("nulls", {}))
+        merged["repairs"] = _add_counts(merged["repairs"], profile.get("repairs", {}))
+        merged["amount_buckets"] = _add_counts(merged["amount_buckets"], profile.get("amount_buckets", {}))
+
+        for column, histogram in profile.get("histograms", {}).items():
+            merged["histograms"][column] = _add_counts(merged["histograms"].get(column, {}), histogram)
+
+        for column, encoded in profile.get("distinct", {}).items():
+            if column in merged["distinct"]:
+                encoded = _encode_registers(np.maximum(_decode_registers(merged["distinct"][column]), _decode_registers(encoded)))
+            merged["distinct"][column] = encoded
+
+    return merged
+
+# -----
+
+def summarize_profile(param_profile: dict) -> dict:
+    """
+    Turn a profile into comparable metrics: null and repair rates over the
+    input rows, value shares and distinct ratios over the output rows, and
+    purchase amount quantiles.
+
+    Args:
+        param_profile: Profile of a source
+
+    Returns:
+        dict: Metric value keyed by metric name, e.g. repair_rate.signup_date_missing
+    """
+
+    rows_in = max(param_profile["rows_in"], 1)
+    rows_out = max(param_profile["rows_out"], 1)
+    metrics = {}
+
+    for column, count in param_profile["nulls"].items():
+        metrics[f"null_rate.{column}"] = count / rows_in
+
+    for rule, count in param_profile["repairs"].items():
+        metrics[f"repair_rate.{rule}"] = count / rows_in
+
+    for column, histogram in param_profile["histograms"].items():
+        for value, count in histogram.items():
+            metrics[f"share.{column}.{value}"] = count / rows_out
+
+    for column, encoded in param_profile["distinct"].items():
+        metrics[f"distinct_ratio.{column}"] = min(estimate_distinct(encoded) / rows_out, 1.0)
+
+    if param_profile["amount_buckets"]:
+        for quantile in AMOUNT_QUANTILES:
+            metrics[f"amount.p{round(quantile * 100)}"] = amount_quantile(param_profile["amount_buckets"], quantile)
+
+    return metrics
+
+# -----
+
+def compare_summaries(param_current: dict, param_previous: dict) -> list:
+    """
+    List the metrics that drifted between two summaries of a source: changed
+    by DRIFT_RATIO or more, either way, and by at least DRIFT_MIN_DELTA.
+    Metrics missing from one summary count as 0.
+
+    Returns:
+        list: (metric, previous value, current value) of each drifted metric
+    """
+
+    drifts = []
+
+    for metric in sorted(param_current.keys() | param_previous.keys()):
+        current, previous = param_current.get(metric, 0.0), param_previous.get(metric, 0.0)
+
+        if abs(current - previous) >= DRIFT_MIN_DELTA and max(current, previous) >= DRIFT_RATIO * min(current, previous):
+            drifts.append((metric, previous, current))
+
+    return drifts
+
+# -----
+
+def save_part_profile(param_part_path: str, param_profile: dict) -> str:
+    """ Save the profile of a cleaned part next to it, for the merge to combine. """
+
+    profile_path = param_part_path + PART_PROFILE_SUFFIX
+    with atomic_output_path(profile_path) as temporary_path, open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(param_profile, file)
+
+    return profile_path
+
+# -----
+
+def load_parts_profile(param_part_paths: list) -> dict:
+    """ Merge the saved profiles of cleaned parts, None when a part has no profile. """
+
+    profiles = []
+    for part_path in param_part_paths:
+        if not os.path.exists(part_path + PART_PROFILE_SUFFIX):
+            return None
+
+        with open(part_path + PART_PROFILE_SUFFIX, encoding="utf-8") as file:
+            profiles.append(json.load(file))
+
+    return merge_profiles(*profiles)
+
+# -----
+
+def _profiles_dir() -> str:
+    """ Return the directory run profiles are persisted in. """
+
+    return os.path.join(os.getcwd(), "data", "profiles")
+
+# -----
+
+def load_previous_run_profile(param_exclude_run: str = None) -> dict:
+    """ Load the most recent persisted run profile, other than param_exclude_run, or None. """
+
+    profiles_dir = _profiles_dir()
+    runs = []
+
+    for name in os.listdir(profiles_dir) if os.path.isdir(profiles_dir) else []:
+        if name.endswith(".json") and not name.startswith("."):
+            with open(os.path.join(profiles_dir, name), encoding="utf-8") as file:
+                run = json.load(file)
+            if run["run_id"] != param_exclude_run:
+                runs.append(run)
+
+    return max(runs, key=lambda run: run["created_at"]) if runs else None
+
+# -----
+
+def record_run_profiles(param_profiles: dict, param_run_id: str = None) -> list:
+    """
+    Persist the source profiles of a run under data/profiles and report the
+    metrics that drifted since the previous run.
+
+    Args:
+        param_profiles: Profile per processed file name
+        param_run_id: Identifier of the run, a timestamp when None
+
+    Returns:
+        list: (file name, metric, previous value, current value) of each drifted metric
+    """
+
+    created_at = datetime.now(timezone.utc)
+    run_id = param_run_id or created_at.strftime("%Y%m%dT%H%M%S%fZ")
+    previous = load_previous_run_profile(run_id)
+
+    run = {
+        "run_id": run_id,
+        "created_at": created_at.isoformat(),
+        "sources": {
+            name: {"summary": summarize_profile(profile), "profile": profile}
+            for name, profile in sorted(param_profiles.items())
+        }
+    }
+
+    os.makedirs(_profiles_dir(), exist_ok=True)
+    with atomic_output_path(os.path.join(_profiles_dir(), f"{safe_file_name(run_id)}.json")) as temporary_path, open(temporary_path, "w", encoding="utf-8") as file:
+        json.dump(run, file, indent=1)
+
+    drifts = []
+    for name, source in run["sources"].items():
+        if previous is None or name not in previous["sources"]:
+            continue
+
+        for metric, previous_value, current_value in compare_summaries(source["summary"], previous["sources"][name]["summary"]):
+            drifts.append((name, metric, previous_value, current_value))
+            print(f"Dérive {name} {metric}: {previous_value:.4g} -> {current_value:.4g}")
+
+    return drifts
@@ -0,0 +1,152 @@
+""" Hand dataframes over between processes through shared memory instead of pickling them through pipes. """
+
+import os
+import uuid
+import pickle
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+import pandas as pd
+
+# Prefix of the shared memory blocks, to find the ones left behind by a crashed process
+SHARED_BLOCK_PREFIX = "customers_frame_"
+
+_ALIGNMENT = 64
+
+# Blocks attached by this process, kept open while dataframes view their memory
+_ATTACHED_BLOCKS = []
+
+# -----
+
+def _open_block(param_name: str, param_size: int = 0) -> shared_memory.SharedMemory:
+    """
+    Create (with a size) or attach a shared memory block the caller is responsible for.
+    The block is kept out of the multiprocessing resource tracker, which would
+    otherwise unlink it when the creating process exits, before the consumer
+    attached it.
+    """
+
+    create = param_size > 0
+
+    try:
+        return shared_memory.SharedMemory(name=param_name, create=create, size=param_size, track=False)
+    except TypeError:
+        # Python before 3.13 always registers the block
+        block = shared_memory.SharedMemory(name=param_name, create=create, size=param_size)
+        resource_tracker.unregister(block._name, "shared_memory")
+
+        return block
+
+# -----
+
+def _unlink_block(param_block: shared_memory.SharedMemory) -> None:
+    """ Remove the name of a block opened by _open_block. """
+
+    if getattr(param_block, "_track", True):
+        # Python before 3.13 unregisters the block when unlinking it
+        resource_tracker.register(param_block._name, "shared_memory")
+    param_block.unlink()
+
+    return None
+
+# -----
+
+def share_dataframe(param_dataframe: pd.DataFrame) -> dict:
+    """
+    Copy a dataframe into a single shared memory block.
+    The dataframe is pickled with protocol 5, which hands the buffers of its
+    NumPy blocks out of band: they are copied once into the shared memory
+    block instead of through the pickle stream. Object columns such as
+    strings stay in the stream, itself stored in the block. The returned
+    handle is small and cheap to send to another process, which rebuilds the
+    dataframe with attach_dataframe. The block belongs to the consumer,
+    which unlinks it when attaching it.
+
+    Args:
+        param_dataframe: Dataframe to share, with picklable attrs
+
+    Returns:
+        dict: Handle with the block name and the layout of the buffers
+    """
+
+    buffers = []
+    stream = pickle.dumps(param_dataframe, protocol=5, buffer_callback=buffers.append)
+    buffers = [buffer.raw() for buffer in buffers]
+
+    layout, size = [], -(-len(stream) // _ALIGNMENT) * _ALIGNMENT
+    for buffer in buffers:
+        layout.append([size, buffer.nbytes])
+        size += -(-buffer.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+    block = _open_block(f"{SHARED_BLOCK_PREFIX}{os.getpid()}_{uuid.uuid4().hex[:12]}", max(size, 1))
+
+    try:
+        block.buf[:len(stream)] = stream
+        for (offset, length), buffer in zip(layout, buffers):
+            block.buf[offset:offset + length] = buffer
+    except BaseException:
+        block.close()
+        _unlink_block(block)
+        raise
+
+    handle = {"name": block.name, "stream": len(stream), "buffers": layout}
+    block.close()
+
+    return handle
+
+# -----
+
+def _close_unused_blocks() -> None:
+    """ Close the attached blocks whose memory is no longer viewed by any dataframe or column. """
+
+    for block in list(_ATTACHED_BLOCKS):
+        try:
+            block.close()
+        except BufferError:
+            # A column outlived its dataframe, the block is closed at a later sweep
+            continue
+        _ATTACHED_BLOCKS.remove(block)
+
+    return None
+
+# -----
+
+def attach_dataframe(param_handle: dict) -> pd.DataFrame:
+    """
+    Rebuild a dataframe shared by share_dataframe, in any process.
+    The NumPy blocks of the dataframe are views on the shared memory block
+    and are not copied. The block name is unlinked right away. The block is
+    kept until the dataframe is freed, then closed once no column views its
+    memory anymore.
+
+    Args:
+        param_handle: Handle returned by share_dataframe
+
+    Returns:
+        pd.DataFrame: Shared dataframe
+    """
+
+    block = _open_block(param_handle["name"])
+    _unlink_block(block)
+    _ATTACHED_BLOCKS.append(block)
+
+    with block.buf[:param_handle["stream"]] as stream:
+        dataframe = pickle.loads(stream, buffers=[block.buf[offset:offset + length] for offset, length in param_handle["buffers"]])
+
+    weakref.finalize(dataframe, _close_unused_blocks)
+
+    return dataframe
+
+# -----
+
+def discard_handle(param_handle: dict) -> None:
+    """ Free the block of a handle that will never be attached, e.g. after a failure. """
+
+    try:
+        block = _open_block(param_handle["name"])
+    except FileNotFoundError:
+        return None
+
+    _unlink_block(block)
+    block.close()
+
+    return None
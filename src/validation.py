@@ -0,0 +1,223 @@
+""" Validate processed customer data against the data quality constraints. """
+
+import os
+import numpy as np
+import pandas as pd
+import pycountry
+from src.compression import compression_of, read_csv, resolve_path
+
+PROCESSED_FILES = ["customers_cleaned.csv", "customers_cleaned2.csv", "customers_cleaned3.csv"]
+REQUIRED_COLUMNS = ["customer_id", "full_name", "email", "signup_date", "country", "age", "last_purchase_amount", "loyalty_tier"]
+
+# ISO 3166-1 alpha-2 codes, shared with the cleaning rules
+VALID_COUNTRY_CODES = frozenset(country.alpha_2 for country in pycountry.countries)
+
+EMAIL_PATTERN = r"^[^@\s]+@\w+(?:[.-]\w+)*\.\w+$"
+
+_COLUMN_DTYPES = {
+    "customer_id": "Int64",
+    "full_name": "str",
+    "email": "str",
+    "signup_date": "str",
+    "country": "str",
+    "age": "Int64",
+    "last_purchase_amount": "float64",
+    "loyalty_tier": "str"
+}
+
+# -----
+
+def load_processed_data(param_path: str) -> pd.DataFrame:
+    """
+    Load a processed customers file once, memory-mapped and with explicit types.
+    Compressed files are decompressed in memory instead of memory-mapped.
+    Unparseable signup dates are loaded as NaT so they can be reported.
+
+    Args:
+        param_path: Path of the processed CSV file
+
+    Returns:
+        pd.DataFrame: Typed customers dataframe
+    """
+
+    if compression_of(param_path):
+        dataframe = read_csv(param_path, dtype=_COLUMN_DTYPES)
+    else:
+        dataframe = pd.read_csv(param_path, dtype=_COLUMN_DTYPES, memory_map=True)
+
+    if "signup_date" in dataframe.columns:
+        dataframe["signup_date"] = pd.to_datetime(dataframe["signup_date"], format="%Y-%m-%d", errors="coerce")
+
+    return dataframe
+
+# -----
+
+def iter_processed_data(param_path: str, param_chunk_rows: int = 100_000):
+    """
+    Read a processed customers file in chunks, typed like load_processed_data.
+    Compressed files are decompressed while streaming.
+
+    Args:
+        param_path: Path of the processed CSV file
+        param_chunk_rows: Number of rows per chunk
+
+    Yields:
+        pd.DataFrame: Typed chunk of the customers file
+    """
+
+    with pd.read_csv(param_path, dtype=_COLUMN_DTYPES, compression=compression_of(param_path), chunksize=param_chunk_rows) as chunks:
+        for chunk in chunks:
+            if "signup_date" in chunk.columns:
+                chunk["signup_date"] = pd.to_datetime(chunk["signup_date"], format="%Y-%m-%d", errors="coerce")
+
+            yield chunk
+
+# -----
+
+def _violation_masks(param_dataframe: pd.DataFrame) -> dict:
+    """ Compute one boolean violation mask per constraint over the available columns. """
+
+    columns = param_dataframe.columns
+    masks = {}
+
+    if "age" in columns:
+        age = pd.to_numeric(param_dataframe["age"], errors="coerce")
+        masks["age_null"] = age.isna()
+        masks["age_out_of_range"] = ~age.between(16, 99) & age.notna()
+
+    if "signup_date" in columns:
+        masks["signup_date_invalid"] = pd.to_datetime(param_dataframe["signup_date"], errors="coerce").isna()
+
+    if "email" in columns:
+        email = param_dataframe["email"]
+        masks["email_null"] = email.isna()
+        masks["email_invalid_format"] = ~email.str.match(EMAIL_PATTERN, na=True)
+        masks["email_duplicate"] = email.duplicated() & email.notna()
+
+    if "country" in columns:
+        country = param_dataframe["country"]
+        masks["country_lowercase"] = country.str.contains("[a-z]", na=False, regex=True)
+        masks["country_invalid_iso"] = ~country.isin(VALID_COUNTRY_CODES)
+
+    if "last_purchase_amount" in columns:
+        amount = pd.to_numeric(param_dataframe["last_purchase_amount"], errors="coerce")
+        masks["last_purchase_amount_null"] = amount.isna()
+        masks["last_purchase_amount_negative"] = amount < 0
+
+    if "loyalty_tier" in columns:
+        masks["loyalty_tier_unknown"] = param_dataframe["loyalty_tier"] == "UNKNOWN"
+
+    return masks
+
+# -----
+
+def validate_customers_data(param_dataframe: pd.DataFrame) -> dict:
+    """
+    Evaluate every data quality constraint on a customers dataframe.
+    All constraint masks are stacked into a single matrix so violation counts
+    and invalid rows are computed in one vectorized reduction.
+
+    Args:
+        param_dataframe: Customers dataframe to validate
+
+    Returns:
+        dict: Report with row count, missing columns, violation count per rule,
+            number of invalid rows and overall validity
+    """
+
+    return _report_from_masks(_violation_masks(param_dataframe), len(param_dataframe), param_dataframe.columns)
+
+# -----
+
+def _report_from_masks(param_masks: dict, param_rows: int, param_columns: pd.Index) -> dict:
+    """ Build the validation report of a dataframe from its violation masks. """
+
+    rules = list(param_masks)
+
+    if rules:
+        matrix = np.column_stack([param_masks[rule].to_numpy(dtype=bool, na_value=False) for rule in rules])
+    else:
+        matrix = np.zeros((param_rows, 0), dtype=bool)
+
+    counts = matrix.sum(axis=0)
+    missing_columns = [column for column in REQUIRED_COLUMNS if column not in param_columns]
+    invalid_rows = int(matrix.any(axis=1).sum())
+
+    return {
+        "rows": param_rows,
+        "missing_columns": missing_columns,
+        "violations": {rule: int(count) for rule, count in zip(rules, counts)},
+        "invalid_rows": invalid_rows,
+        "valid": param_rows > 0 and not missing_columns and invalid_rows == 0
+    }
+
+# -----
+
+def validate_customers_chunks(param_chunks) -> dict:
+    """
+    Evaluate every data quality constraint on a customers file read in chunks,
+    e.g. by iter_processed_data, holding a single chunk in memory at a time.
+    Violations are counted per chunk and summed. Duplicate emails are found
+    across chunks from the sorted 64-bit hashes of the emails already seen,
+    which are far smaller than the rows themselves.
+
+    Args:
+        param_chunks: Iterable of customers dataframes with the same columns
+
+    Returns:
+        dict: Same report as validate_customers_data over the whole file
+    """
+
+    report = _report_from_masks({}, 0, pd.Index([]))
+    seen = np.empty(0, dtype=np.uint64)
+
+    for chunk in param_chunks:
+        masks = _violation_masks(chunk)
+
+        if "email_duplicate" in masks:
+            present = chunk["email"].notna().to_numpy()
+            hashes = pd.util.hash_pandas_object(chunk["email"], index=False).to_numpy()
+            position = np.minimum(np.searchsorted(seen, hashes), max(len(seen) - 1, 0))
+            seen_before = seen[position] == hashes if len(seen) else np.zeros(len(hashes), dtype=bool)
+            masks["email_duplicate"] = masks["email_duplicate"] | (seen_before & present)
+
+            # Both runs are sorted, so the stable sort merges them in linear time
+            seen = np.sort(np.concatenate([seen, np.unique(hashes[present])]), kind="stable")
+
+        chunk_report = _report_from_masks(masks, len(chunk), chunk.columns)
+        report = {
+            "rows": report["rows"] + chunk_report["rows"],
+            "missing_columns": chunk_report["missing_columns"],
+            "violations": {rule: report["violations"].get(rule, 0) + count for rule, count in chunk_report["violations"].items()},
+            "invalid_rows": report["invalid_rows"] + chunk_report["invalid_rows"]
+        }
+        report["valid"] = report["rows"] > 0 and not report["missing_columns"] and report["invalid_rows"] == 0
+
+    return report
+
+# -----
+
+def validate_processed_files(param_processed_dir: str = None) -> dict:
+    """
+    Validate every processed customers file, plain or compressed, loading each file only once.
+
+    Args:
+        param_processed_dir: Processed data directory, defaults to data/processed
+
+    Returns:
+        dict: Report per file name, None for files that do not exist
+    """
+
+    processed_dir = param_processed_dir or os.path.join(os.getcwd(), "data", "processed")
+    reports = {}
+
+    for file_name in PROCESSED_FILES:
+        try:
+            path = resolve_path(os.path.join(processed_dir, file_name))
+        except FileNotFoundError:
+            reports[file_name] = None
+            continue
+
+        reports[file_name] = validate_customers_data(load_processed_data(path))
+
+    return reports
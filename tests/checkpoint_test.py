@@ -0,0 +1,127 @@
+""" Tests for resuming interrupted pipeline runs from their checkpoints. """
+
+import os
+import shutil
+import pandas as pd
+import pytest
+from src import memory_budget, pipeline
+from src.checkpoint import CHECKPOINT_DIR_NAME, RunCheckpoint
+from src.compression import atomic_output_path
+from src.pipeline import main, run_pipeline
+
+# -----
+
+def read_processed(param_workspace: str) -> dict:
+    """ Read the visible processed CSV files of a workspace. """
+
+    processed_dir = os.path.join(param_workspace, "data", "processed")
+
+    return {
+        name: pd.read_csv(os.path.join(processed_dir, name))
+        for name in sorted(os.listdir(processed_dir))
+        if name.endswith(".csv")
+    }
+
+# -----
+
+class TestCheckpoint:
+    """ Tests for the checkpoints and atomic outputs of the pipeline. """
+
+    def test_resume_after_failed_merge(self, workspace: str, monkeypatch) -> None:
+        """ Test that a retry skips the cleaned sources and only redoes the failed stage. """
+
+        run_pipeline()
+        expected = read_processed(workspace)
+        shutil.rmtree(os.path.join(workspace, "data", "processed"))
+        os.makedirs(os.path.join(workspace, "data", "processed"))
+
+        def fail(*param_args) -> None:
+            raise RuntimeError("interrupted")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(pipeline, "save_merged_data", fail)
+            with pytest.raises(RuntimeError):
+                run_pipeline(param_run_id="run-1")
+
+        assert not os.path.exists(os.path.join(workspace, "data", "processed", "customers_golden.csv"))
+
+        monkeypatch.setattr(pipeline, "_load_and_clean", fail)
+        run_pipeline(param_run_id="run-1")
+
+        result = read_processed(workspace)
+        assert result.keys() == expected.keys()
+        for name, dataframe in expected.items():
+            pd.testing.assert_frame_equal(result[name], dataframe)
+
+        assert not os.path.exists(os.path.join(workspace, "data", "processed", CHECKPOINT_DIR_NAME))
+
+        return None
+
+    # -----
+
+    def test_resume_chunked_source(self, workspace: str, monkeypatch) -> None:
+        """ Test that a chunked run resumes after its last completed chunk. """
+
+        main(["--memory-budget", "1K"])
+        expected = read_processed(workspace)
+
+        calls, limit = [], [3]
+        clean_customer_source = memory_budget.clean_customer_source
+
+        def counted_clean(*param_args, **param_kwargs) -> pd.DataFrame:
+            calls.append(param_args[1])
+            if len(calls) > limit[0]:
+                raise RuntimeError("interrupted")
+            return clean_customer_source(*param_args, **param_kwargs)
+
+        monkeypatch.setattr(memory_budget, "clean_customer_source", counted_clean)
+        with pytest.raises(RuntimeError):
+            main(["--memory-budget", "1K", "--run-id", "run-2"])
+
+        calls.clear()
+        limit[0] = float("inf")
+        main(["--memory-budget", "1K", "--run-id", "run-2"])
+
+        rows = len(pd.read_csv(os.path.join(workspace, "data", "raw", "customers_dirty.csv")))
+        assert calls.count("customers_dirty.csv") == rows - 3
+
+        result = read_processed(workspace)
+        for name, dataframe in expected.items():
+            pd.testing.assert_frame_equal(result[name], dataframe)
+
+        assert not os.path.exists(os.path.join(workspace, "data", "processed", CHECKPOINT_DIR_NAME))
+
+        return None
+
+    # -----
+
+    def test_changed_fingerprint_discards_checkpoint(self, workspace: str) -> None:
+        """ Test that a checkpoint recorded with other inputs is not resumed. """
+
+        checkpoint = RunCheckpoint("run-3", "scope", {"source": 1})
+        checkpoint.save("unit", {"value": 1}, {"rows_read": 2})
+
+        assert RunCheckpoint("run-3", "scope", {"source": 1}).load("unit") == {"value": 1}
+        assert not RunCheckpoint("run-3", "scope", {"source": 2}).completed("unit")
+
+        return None
+
+    # -----
+
+    def test_atomic_output_path(self, tmp_path) -> None:
+        """ Test that a failed write leaves the previous file and no temporary file. """
+
+        path = str(tmp_path / "customers_cleaned.csv")
+        with atomic_output_path(path) as temporary_path, open(temporary_path, "w", encoding="utf-8") as file:
+            file.write("complete")
+
+        with pytest.raises(RuntimeError):
+            with atomic_output_path(path) as temporary_path, open(temporary_path, "w", encoding="utf-8") as file:
+                file.write("partial")
+                raise RuntimeError("interrupted")
+
+        with open(path, encoding="utf-8") as file:
+            assert file.read() == "complete"
+        assert os.listdir(tmp_path) == ["customers_cleaned.csv"]
+
+        return None
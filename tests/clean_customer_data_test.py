@@ -1,7 +1,7 @@
 """ Tests for clean_customers_data function. """
 
 import pandas as pd
-from src.clean_data import clean_customers_data
+from src.clean_data import clean_customer_source, clean_customers_data
 
 # -----
 
@@ -85,3 +85,23 @@ class TestCleanCustomersData:
         assert result3["age"][0] == 25
 
         return None
+
+    # -----
+
+    def test_uk_country_code_is_mapped_to_iso(self) -> None:
+        """ Test that the non-ISO UK country code of every source is cleaned to GB. """
+
+        dataframe = pd.DataFrame({
+            "age": [30, 40],
+            "signup_date": ["2024-01-15", "2024-02-15"],
+            "email": ["emma.dupont@example.com", "sarah.connor@example.com"],
+            "country": ["UK", "uk"],
+            "last_purchase_amount": [100.0, 55.0]
+        })
+
+        result = clean_customer_source(dataframe, "customers_dirty.csv")
+
+        assert result["country"].tolist() == ["GB", "GB"]
+        assert result.attrs["repairs"]["country_alias_mapped"] == 2
+
+        return None
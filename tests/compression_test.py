@@ -0,0 +1,121 @@
+""" Tests for reading and writing compressed customer files. """
+
+import gzip
+import os
+import shutil
+import pandas as pd
+import pytest
+from src import clean_data, compression
+from src.compression import read_csv, write_csv
+from src.lookup_index import refresh_lookup_indexes
+from src.load_data import discover_raw_files, load_customer_source
+
+# -----
+
+class TestCompression:
+    """ Tests for the compressed CSV helpers. """
+
+    @staticmethod
+    def build_dataframe(param_rows: int) -> pd.DataFrame:
+        """ Build a customers-like dataframe. """
+
+        return pd.DataFrame({
+            "customer_id": range(param_rows),
+            "email": [f"customer{index}@example.com" for index in range(param_rows)],
+            "country": ["FR", "DE", "IT", "ES"] * (param_rows // 4)
+        })
+
+    # -----
+
+    def test_gzip_multi_member_round_trip(self, tmp_path, monkeypatch) -> None:
+        """ Test that gzip output is split in members and decoded back in parallel. """
+
+        monkeypatch.setattr(compression, "COMPRESSED_BLOCK_SIZE", 1024)
+        dataframe = self.build_dataframe(400)
+        path = str(tmp_path / "customers.csv.gz")
+
+        write_csv(dataframe, path, param_workers=2)
+
+        with open(path, "rb") as file:
+            assert file.read().count(b"\x1f\x8b\x08") > 1
+        assert compression._decompress_gzip_parallel(path, 2) is not None
+        pd.testing.assert_frame_equal(read_csv(path, param_workers=2), dataframe)
+
+        return None
+
+    # -----
+
+    def test_gzip_single_member(self, tmp_path) -> None:
+        """ Test that a plain single-member gzip file is streamed. """
+
+        dataframe = self.build_dataframe(40)
+        path = str(tmp_path / "customers.csv.gz")
+        with gzip.open(path, "wt") as file:
+            dataframe.to_csv(file, index=False)
+
+        pd.testing.assert_frame_equal(read_csv(path), dataframe)
+
+        return None
+
+    # -----
+
+    def test_zstd_round_trip(self, tmp_path) -> None:
+        """ Test zstd output and input. """
+
+        pytest.importorskip("zstandard")
+        dataframe = self.build_dataframe(40)
+        path = str(tmp_path / "customers.csv.zst")
+
+        write_csv(dataframe, path)
+
+        pd.testing.assert_frame_equal(read_csv(path), dataframe)
+
+        return None
+
+    # -----
+
+    def test_load_compressed_raw_source(self, tmp_path, monkeypatch) -> None:
+        """ Test that raw sources are discovered and loaded from compressed files. """
+
+        raw_dir = tmp_path / "data" / "raw"
+        os.makedirs(raw_dir)
+        with open(os.path.join(os.getcwd(), "data", "raw", "customers_dirty2.csv"), "rb") as source:
+            with gzip.open(raw_dir / "customers_dirty2.csv.gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+        expected = pd.read_csv(os.path.join(os.getcwd(), "data", "raw", "customers_dirty2.csv"))
+        monkeypatch.chdir(tmp_path)
+
+        assert discover_raw_files() == ["customers_dirty2.csv"]
+        pd.testing.assert_frame_equal(load_customer_source("customers_dirty2.csv"), expected)
+
+        return None
+
+    # -----
+
+    def test_processed_file_replaces_other_compression(self, tmp_path, monkeypatch) -> None:
+        """ Test that the other variants of a processed file are only removed once the new one is written. """
+
+        processed_dir = tmp_path / "data" / "processed"
+        os.makedirs(processed_dir)
+        monkeypatch.chdir(tmp_path)
+        dataframe = self.build_dataframe(8)
+
+        clean_data._write_processed_file(dataframe, "customers_cleaned.csv")
+        refresh_lookup_indexes(str(processed_dir))
+
+        def failing_write_csv(param_dataframe: pd.DataFrame, param_path: str) -> str:
+            raise OSError("disk full")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(clean_data, "write_csv", failing_write_csv)
+            with pytest.raises(OSError):
+                clean_data._write_processed_file(dataframe, "customers_cleaned.csv", "gzip")
+
+        assert sorted(os.listdir(processed_dir)) == ["customers_cleaned.csv", "customers_cleaned.csv.idx.npz"]
+
+        clean_data._write_processed_file(dataframe, "customers_cleaned.csv", "gzip")
+
+        assert os.listdir(processed_dir) == ["customers_cleaned.csv.gz"]
+        pd.testing.assert_frame_equal(read_csv(str(processed_dir / "customers_cleaned.csv.gz")), dataframe)
+
+        return None
@@ -0,0 +1,17 @@
+""" Fixtures shared by the pipeline tests. """
+
+import os
+import shutil
+import pytest
+
+# -----
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch) -> str:
+    """ Run the test from a copy of the raw data with an empty processed directory. """
+
+    shutil.copytree(os.path.join(os.getcwd(), "data", "raw"), os.path.join(tmp_path, "data", "raw"))
+    os.makedirs(os.path.join(tmp_path, "data", "processed"))
+    monkeypatch.chdir(tmp_path)
+
+    return str(tmp_path)
@@ -0,0 +1,59 @@
+""" Tests for the Airflow DAG of the pipeline, skipped when Airflow is not installed. """
+
+import os
+import importlib.util
+import pytest
+
+DAG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "airflow", "dags", "dataops_customers_dag.py")
+
+# -----
+
+@pytest.fixture
+def python_dag(workspace, tmp_path_factory, monkeypatch):
+    """ Load the DAG in "python" mode, run from the workspace while the worker runs elsewhere. """
+
+    airflow_home = str(tmp_path_factory.mktemp("airflow"))
+    monkeypatch.setenv("AIRFLOW_HOME", airflow_home)
+    monkeypatch.setenv("AIRFLOW__DATABASE__SQL_ALCHEMY_CONN", f"sqlite:///{os.path.join(airflow_home, 'airflow.db')}")
+    monkeypatch.setenv("PIPELINE_EXECUTOR", "python")
+    monkeypatch.setenv("PIPELINE_DIR", workspace)
+    monkeypatch.setenv("SOURCE_SHARDS", "2")
+    pytest.importorskip("airflow.sdk")
+
+    spec = importlib.util.spec_from_file_location("dataops_customers_dag", DAG_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    monkeypatch.chdir(airflow_home)
+
+    return module.dag
+
+# -----
+
+class TestCustomersDag:
+    """ Tests for the structure and an in-process run of the DAG. """
+
+    def test_structure(self, python_dag) -> None:
+        """ Test that every source is cleaned before the merge and the checks. """
+
+        assert set(python_dag.task_dict) == {"discover_partitions", "clean_source", "merge_and_check"}
+        assert python_dag.get_task("clean_source").upstream_task_ids == {"discover_partitions"}
+        assert python_dag.get_task("merge_and_check").upstream_task_ids == {"clean_source"}
+
+        return None
+
+    # -----
+
+    def test_python_run(self, python_dag, workspace: str) -> None:
+        """ Test that a run in "python" mode reads and writes the data of PIPELINE_DIR. """
+
+        from airflow.utils.db import initdb
+
+        initdb()
+        python_dag.test()
+
+        processed_dir = os.path.join(workspace, "data", "processed")
+
+        assert os.path.exists(os.path.join(processed_dir, "customers_golden.csv"))
+        assert not os.path.exists(os.path.join(processed_dir, "parts"))
+
+        return None
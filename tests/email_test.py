@@ -51,3 +51,22 @@ class TestFixEmail:
         assert ".com" in result["email"][1]
 
         return None
+
+    # -----
+
+    def test_fix_email_keeps_valid_emails(self) -> None:
+        """ Test that only emails needing a repair are rewritten. """
+
+        dataframe = pd.DataFrame({
+            "email": ["anna.k@example.com", "paul.martin@example.com", "laura.bernardexample.com"],
+            "full_name": ["Anna Kowalski", "Paul Martin", "Laura Bernard"]
+        })
+        result = _fix_email(dataframe, param_specific_fix="format_name")
+
+        assert result["email"].tolist() == [
+            "anna.kowalski@example.com",
+            "paul.martin@example.com",
+            "laura.bernard@example.com"
+        ]
+
+        return None
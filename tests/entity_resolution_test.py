@@ -0,0 +1,70 @@
+""" Tests for the near-duplicate customer detection. """
+
+import pandas as pd
+from src.entity_resolution import assign_duplicate_clusters
+
+# -----
+
+class TestAssignDuplicateClusters:
+    """ Tests for the assign_duplicate_clusters function. """
+
+    def test_near_duplicate_emails_share_cluster(self) -> None:
+        """ Test that an abbreviated email of the same person is clustered together. """
+
+        dataframe = pd.DataFrame({
+            "full_name": ["Anna Kowalski", "Anna Kowalski", "Paul Martin"],
+            "email": ["anna.k@example.com", "anna.kowalski@example.com", "paul.martin@example.com"]
+        })
+        result = assign_duplicate_clusters(dataframe)
+
+        assert result["cluster_id"][0] == result["cluster_id"][1]
+        assert result["cluster_id"][0] != result["cluster_id"][2]
+
+        return None
+
+    # -----
+
+    def test_same_name_different_emails_are_distinct(self) -> None:
+        """ Test that homonyms with unrelated emails stay in separate clusters. """
+
+        dataframe = pd.DataFrame({
+            "full_name": ["Jean Martin", "Jean Martin"],
+            "email": ["jean.martin@example.com", "jm1984@example.com"]
+        })
+        result = assign_duplicate_clusters(dataframe)
+
+        assert result["cluster_id"].nunique() == 2
+
+        return None
+
+    # -----
+
+    def test_accents_and_clusters_are_transitive(self) -> None:
+        """ Test accent-insensitive matching and transitive clustering across blocks. """
+
+        dataframe = pd.DataFrame({
+            "full_name": ["Pedro García", "Pedro Garcia", "Garcia Pedro", "Li Wei"],
+            "email": ["pedro.garcia@example.com", "pedro.garcia@example.org", "pedro.g@example.com", None]
+        })
+        result = assign_duplicate_clusters(dataframe)
+
+        assert result["cluster_id"][:3].nunique() == 1
+        assert result["cluster_id"][3] != result["cluster_id"][0]
+
+        return None
+
+    # -----
+
+    def test_large_blocks_are_windowed(self) -> None:
+        """ Test that rows of a large block are only compared with their neighbours, which still match. """
+
+        dataframe = pd.DataFrame({
+            "full_name": [f"Client Number{index:03d}" for index in range(50)] + ["Anna Kowalski"] * 2,
+            "email": [f"client{index:03d}@example.com" for index in range(50)] + ["anna.k@example.com", "anna.kowalski@example.com"]
+        })
+        result = assign_duplicate_clusters(dataframe, param_window=2, param_workers=1)
+
+        assert result["cluster_id"].iloc[-1] == result["cluster_id"].iloc[-2]
+        assert len(result) == 52
+
+        return None
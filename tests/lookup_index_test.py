@@ -0,0 +1,123 @@
+""" Tests for the customer lookup index. """
+
+import os
+import pandas as pd
+from src import compression
+from src.compression import write_csv
+from src.lookup_index import build_lookup_index, lookup_customer, refresh_lookup_indexes
+
+# -----
+
+class TestLookupIndex:
+    """ Tests for building, refreshing and querying lookup indexes. """
+
+    @staticmethod
+    def write_processed_file(param_path: str, param_rows: list) -> None:
+        """ Write a processed customers file with the given (customer_id, email) rows. """
+
+        pd.DataFrame({
+            "customer_id": [row[0] for row in param_rows],
+            "full_name": [f"Customer {row[0]}" for row in param_rows],
+            "email": [row[1] for row in param_rows]
+        }).to_csv(param_path, index=False)
+
+        return None
+
+    # -----
+
+    def test_lookup_by_customer_id_and_email(self, tmp_path) -> None:
+        """ Test point lookups by customer_id and by email. """
+
+        self.write_processed_file(
+            os.path.join(tmp_path, "customers_cleaned.csv"),
+            [(3, "c@example.com"), (1, "a@example.com"), (2, "b@example.com")]
+        )
+
+        row = lookup_customer(param_customer_id=2, param_processed_dir=str(tmp_path))
+        assert row["email"] == "b@example.com"
+
+        row = lookup_customer(param_email="A@Example.com", param_processed_dir=str(tmp_path))
+        assert row["customer_id"] == "1"
+        assert row["full_name"] == "Customer 1"
+
+        assert lookup_customer(param_customer_id=42, param_processed_dir=str(tmp_path)) is None
+
+        return None
+
+    # -----
+
+    def test_lookup_searches_every_processed_file(self, tmp_path) -> None:
+        """ Test that lookups find rows stored in any processed file. """
+
+        self.write_processed_file(os.path.join(tmp_path, "customers_cleaned.csv"), [(1, "a@example.com")])
+        self.write_processed_file(os.path.join(tmp_path, "customers_cleaned2.csv"), [(2, "b@example.com")])
+        build_lookup_index(os.path.join(tmp_path, "customers_cleaned.csv"))
+
+        row = lookup_customer(param_customer_id=2, param_processed_dir=str(tmp_path))
+
+        assert row["email"] == "b@example.com"
+
+        return None
+
+    # -----
+
+    def test_refresh_only_rebuilds_changed_files(self, tmp_path) -> None:
+        """ Test that refreshing re-indexes new or changed files only. """
+
+        first_path = os.path.join(tmp_path, "customers_cleaned.csv")
+        second_path = os.path.join(tmp_path, "customers_cleaned2.csv")
+        self.write_processed_file(first_path, [(1, "a@example.com")])
+
+        assert refresh_lookup_indexes(str(tmp_path)) == [first_path]
+        assert refresh_lookup_indexes(str(tmp_path)) == []
+
+        self.write_processed_file(second_path, [(2, "b@example.com")])
+        assert refresh_lookup_indexes(str(tmp_path)) == [second_path]
+
+        self.write_processed_file(first_path, [(1, "a@example.com"), (5, "e@example.com")])
+        assert refresh_lookup_indexes(str(tmp_path)) == [first_path]
+        assert lookup_customer(param_customer_id=5, param_processed_dir=str(tmp_path))["email"] == "e@example.com"
+
+        return None
+
+    # -----
+
+    def test_lookup_after_rewrite_in_same_process(self, tmp_path) -> None:
+        """ Test that a cached index is not used once its CSV file was rewritten. """
+
+        csv_path = os.path.join(tmp_path, "customers_cleaned.csv")
+        self.write_processed_file(csv_path, [(1, "a@example.com"), (2, "b@example.com")])
+        assert lookup_customer(param_customer_id=2, param_processed_dir=str(tmp_path))["email"] == "b@example.com"
+
+        self.write_processed_file(csv_path, [(10, "long.address@example.com"), (2, "bb@example.com")])
+
+        assert lookup_customer(param_customer_id=2, param_processed_dir=str(tmp_path))["email"] == "bb@example.com"
+
+        return None
+
+    # -----
+
+    def test_lookup_in_compressed_files(self, tmp_path, monkeypatch) -> None:
+        """ Test that rows of gzip and zstd processed files of several blocks are looked up through their index. """
+
+        monkeypatch.setattr(compression, "COMPRESSED_BLOCK_SIZE", 64)
+        rows = [(index, f"customer{index}@example.com") for index in range(40)]
+        self.write_processed_file(os.path.join(tmp_path, "customers_cleaned.csv"), [(100, "plain@example.com")])
+        dataframe = pd.DataFrame({
+            "customer_id": [row[0] for row in rows],
+            "full_name": [f"Customer {row[0]}" for row in rows],
+            "email": [row[1] for row in rows]
+        })
+        write_csv(dataframe.iloc[:20], os.path.join(tmp_path, "customers_cleaned2.csv.gz"))
+        write_csv(dataframe.iloc[20:], os.path.join(tmp_path, "customers_cleaned3.csv.zst"))
+
+        assert len(refresh_lookup_indexes(str(tmp_path))) == 3
+
+        for index, email in rows:
+            assert lookup_customer(param_customer_id=index, param_processed_dir=str(tmp_path)) == {
+                "customer_id": str(index), "full_name": f"Customer {index}", "email": email
+            }
+        assert lookup_customer(param_email="Customer39@example.com", param_processed_dir=str(tmp_path))["customer_id"] == "39"
+        assert lookup_customer(param_customer_id=100, param_processed_dir=str(tmp_path))["email"] == "plain@example.com"
+
+        return None
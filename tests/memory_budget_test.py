@@ -0,0 +1,124 @@
+""" Tests for cleaning customer sources within a memory budget. """
+
+import os
+import pandas as pd
+import pytest
+from src import pipeline
+from src.memory_budget import _SpilledState, choose_chunk_rows, parse_memory_size
+from src.pipeline import main, run_pipeline
+
+RAW_FILES = ["customers_dirty.csv", "customers_dirty2.csv", "customers_dirty3.csv"]
+
+# -----
+
+class TestMemoryBudget:
+    """ Tests for the chunked cleaning of the pipeline. """
+
+    def test_parse_memory_size(self) -> None:
+        """ Test that memory sizes are parsed with binary units. """
+
+        assert parse_memory_size("1048576") == 1024 ** 2
+        assert parse_memory_size("512M") == 512 * 1024 ** 2
+        assert parse_memory_size("1.5GiB") == int(1.5 * 1024 ** 3)
+
+        with pytest.raises(ValueError):
+            parse_memory_size("lots")
+
+        return None
+
+    # -----
+
+    def test_chunk_rows_follow_budget(self) -> None:
+        """ Test that a larger budget gives larger chunks, with at least one row. """
+
+        assert choose_chunk_rows(500, 1024 ** 3) > choose_chunk_rows(500, 1024 ** 2)
+        assert choose_chunk_rows(500, 1) == 1
+
+        return None
+
+    # -----
+
+    def test_chunked_run_matches_full_run(self, workspace: str) -> None:
+        """ Test that cleaning sources one row at a time gives the rows of a full run. """
+
+        expected = run_pipeline()
+
+        main(["--memory-budget", "1K"])
+
+        processed_dir = os.path.join(workspace, "data", "processed")
+        for file_name, dataframe in zip(RAW_FILES, expected):
+            chunked = pd.read_csv(os.path.join(processed_dir, file_name.replace("dirty", "cleaned")))
+
+            assert chunked["customer_id"].tolist() == dataframe["customer_id"].tolist()
+            assert chunked["email"].tolist() == dataframe["email"].tolist()
+            assert chunked["signup_date"].tolist() == dataframe["signup_date"].dt.strftime("%Y-%m-%d").tolist()
+
+        assert not os.path.exists(os.path.join(processed_dir, ".spill"))
+
+        return None
+
+    # -----
+
+    def test_chunked_clusters_span_chunks(self, workspace: str) -> None:
+        """ Test that near-duplicates cleaned in different chunks share a cluster, as in a full run. """
+
+        with open(os.path.join(workspace, "data", "raw", "customers_dirty.csv"), "a", encoding="utf-8") as file:
+            file.write("3011,Jean Morel,jean.m@example.com,2025-01-10,FR,42,120.50,GOLD\n")
+
+        processed_path = os.path.join(workspace, "data", "processed", "customers_cleaned.csv")
+
+        main(["--clusters"])
+        with open(processed_path, "rb") as file:
+            expected = file.read()
+
+        main(["--memory-budget", "1K", "--clusters"])
+        chunked = pd.read_csv(processed_path)
+
+        with open(processed_path, "rb") as file:
+            assert file.read() == expected
+        assert chunked.loc[chunked["customer_id"] == 3001, "cluster_id"].item() == chunked.loc[chunked["customer_id"] == 3011, "cluster_id"].item()
+
+        return None
+
+    # -----
+
+    def test_skipped_merge_still_validates(self, workspace: str, monkeypatch) -> None:
+        """ Test that a run too small for the merge still checks quality and removes the previous golden table. """
+
+        run_pipeline()
+        processed_dir = os.path.join(workspace, "data", "processed")
+
+        with monkeypatch.context() as patch:
+            patch.setattr(pipeline, "validate_customers_chunks", lambda param_chunks: {"valid": False})
+            with pytest.raises(ValueError, match="Data quality check failed"):
+                main(["--memory-budget", "1K"])
+
+        main(["--memory-budget", "1K"])
+
+        assert not os.path.exists(os.path.join(processed_dir, "customers_golden.csv"))
+        assert not os.path.exists(os.path.join(processed_dir, "customers_golden_lineage.csv"))
+
+        return None
+
+    # -----
+
+    def test_spilled_state(self, tmp_path) -> None:
+        """ Test that de-duplication and the median date survive a spill to SQLite. """
+
+        state = _SpilledState(str(tmp_path / "state.sqlite"), 2)
+        dates = pd.Series(pd.to_datetime(["2025-01-01", "2025-01-04", "2025-01-04", "2025-03-01"]))
+
+        assert state.keep_first(pd.Series(["a", "b", "a"])).tolist() == [True, True, False]
+        state.add_dates(dates.iloc[:2].value_counts())
+        assert state.connection is None
+
+        assert state.keep_first(pd.Series(["c", "b"])).tolist() == [True, False]
+        assert state.connection is not None
+
+        state.add_dates(dates.iloc[2:].value_counts())
+        assert state.keep_first(pd.Series(["c", "d"])).tolist() == [False, True]
+        assert state.median_date() == dates.median()
+
+        state.close()
+
+        return None
@@ -0,0 +1,119 @@
+""" Tests for the merge_customers_data and merge_customers_files functions. """
+
+import os
+import pandas as pd
+import pytest
+from src.merge import merge_customers_data, merge_customers_files, save_merged_data
+
+# -----
+
+class TestMergeCustomersData:
+    """ Tests for the cross-source merge into a golden table. """
+
+    @staticmethod
+    def build_sources() -> dict:
+        """ Build two sources sharing one customer. """
+
+        crm = pd.DataFrame({
+            "email": ["Anna.Kowalski@example.com", "paul.martin@example.com"],
+            "full_name": ["Anna Kowalski", "Paul Martin"],
+            "country": [None, "FR"],
+            "age": [29, 45],
+            "cluster_id": [0, 1]
+        })
+        shop = pd.DataFrame({
+            "email": ["anna.kowalski@example.com", "li.wei@example.com"],
+            "full_name": ["Anna K.", "Li Wei"],
+            "country": ["PL", "CN"],
+            "age": [30, 41],
+            "cluster_id": [0, 1]
+        })
+
+        return {"crm": crm, "shop": shop}
+
+    # -----
+
+    @staticmethod
+    def chunks(param_dataframe: pd.DataFrame, param_rows: int):
+        """ Yield a dataframe in chunks of param_rows rows. """
+
+        for start in range(0, len(param_dataframe), param_rows):
+            yield param_dataframe.iloc[start:start + param_rows]
+
+    # -----
+
+    def test_merge_deduplicates_on_email(self) -> None:
+        """ Test that a customer present in several sources appears once. """
+
+        golden, lineage = merge_customers_data(self.build_sources())
+
+        assert golden["email"].tolist() == ["anna.kowalski@example.com", "li.wei@example.com", "paul.martin@example.com"]
+        assert "cluster_id" not in golden.columns
+        assert lineage["email"].tolist() == golden["email"].tolist()
+
+        return None
+
+    # -----
+
+    def test_survivorship_follows_priority(self) -> None:
+        """ Test per-column priority and fallback to the next source on null values. """
+
+        golden, lineage = merge_customers_data(self.build_sources(), param_priority={"age": ["shop", "crm"]})
+        anna = golden.set_index("email").loc["anna.kowalski@example.com"]
+        anna_lineage = lineage.set_index("email").loc["anna.kowalski@example.com"]
+
+        assert anna["full_name"] == "Anna Kowalski"
+        assert anna_lineage["full_name"] == "crm"
+        assert anna["age"] == 30
+        assert anna_lineage["age"] == "shop"
+        assert anna["country"] == "PL"
+        assert anna_lineage["country"] == "shop"
+
+        return None
+
+    # -----
+
+    def test_unknown_source_in_priority(self) -> None:
+        """ Test that a priority naming an unknown source raises an error. """
+
+        with pytest.raises(ValueError):
+            merge_customers_data(self.build_sources(), param_priority={"age": ["erp"]})
+
+        return None
+
+    # -----
+
+    def test_out_of_core_merge_matches_in_memory_merge(self, tmp_path, monkeypatch) -> None:
+        """ Test that merging chunked sources partition by partition writes the in-memory golden table. """
+
+        monkeypatch.chdir(tmp_path)
+        os.makedirs(os.path.join("data", "processed"))
+        golden_path = os.path.join("data", "processed", "customers_golden.csv")
+        lineage_path = os.path.join("data", "processed", "customers_golden_lineage.csv")
+
+        sources = self.build_sources()
+        sources["erp"] = pd.DataFrame({
+            "email": [f"customer{index}@example.com" for index in range(50)] + ["PAUL.MARTIN@example.com"],
+            "full_name": [f"Customer {index}" for index in range(51)],
+            "country": ["DE"] * 51,
+            "age": list(range(20, 71)),
+            "loyalty_tier": ["GOLD"] * 51
+        })
+        priority = {"country": ["erp", "shop"]}
+
+        save_merged_data(*merge_customers_data(sources, param_priority=priority))
+        with open(golden_path, encoding="utf-8") as golden, open(lineage_path, encoding="utf-8") as lineage:
+            expected = golden.read(), lineage.read()
+
+        customers = merge_customers_files(
+            {name: self.chunks(dataframe, 7) for name, dataframe in sources.items()},
+            param_priority=priority,
+            param_partitions=4
+        )
+
+        with open(golden_path, encoding="utf-8") as golden, open(lineage_path, encoding="utf-8") as lineage:
+            assert (golden.read(), lineage.read()) == expected
+        assert customers == 53
+        assert sorted(os.listdir(os.path.join("data", "processed"))) == ["customers_golden.csv", "customers_golden_lineage.csv"]
+
+        return None
@@ -0,0 +1,83 @@
+""" Tests for the full name tokenizer. """
+
+import pandas as pd
+from src.clean_data import _fix_email, clean_customer_source
+from src.names import email_local_part, split_full_name
+
+# -----
+
+class TestNames:
+    """ Tests for the split_full_name and email_local_part functions. """
+
+    def test_split_full_name(self) -> None:
+        """ Test that the first token is the first name and the remaining tokens the last name. """
+
+        full_name = pd.Series(["Marie Dupont", "Ahmed Ben Ali", "  Chloé   Martin ", "Tom", " ", None], dtype="str")
+        names = split_full_name(full_name)
+
+        assert names["first_name"].tolist()[:4] == ["Marie", "Ahmed", "Chloé", "Tom"]
+        assert names["last_name"].tolist()[:3] == ["Dupont", "Ben Ali", "Martin"]
+        assert names["last_name"].isna().tolist() == [False, False, False, True, True, True]
+
+        return None
+
+    # -----
+
+    def test_split_full_name_without_names(self) -> None:
+        """ Test that a column without any name still gives both name columns. """
+
+        names = split_full_name(pd.Series([float("nan"), float("nan")]))
+
+        assert names.columns.tolist() == ["first_name", "last_name"]
+        assert names["last_name"].isna().all()
+
+        return None
+
+    # -----
+
+    def test_email_local_part(self) -> None:
+        """ Test that accents are removed and multi-token last names are joined. """
+
+        names = split_full_name(pd.Series(["Pedro García", "Ahmed Ben Ali", "Anna Müller", "Łukasz Straße", "Tom"], dtype="str"))
+
+        assert email_local_part(names).tolist()[:4] == ["pedro.garcia", "ahmed.benali", "anna.muller", "lukasz.strasse"]
+        assert pd.isna(email_local_part(names).iloc[4])
+
+        return None
+
+    # -----
+
+    def test_fix_email_format_name_accents(self) -> None:
+        """ Test that truncated emails are rebuilt from accented and multi-token names only. """
+
+        dataframe = pd.DataFrame({
+            "email": ["c.m@example.com", "a.b@example.com", "t.x@example.com"],
+            "full_name": ["Chloé Martin", "Ahmed Ben Ali", "Tom"]
+        })
+        result = _fix_email(dataframe, param_specific_fix="format_name")
+
+        assert result["email"].tolist() == ["chloe.martin@example.com", "ahmed.benali@example.com", "t.x@example.com"]
+
+        return None
+
+    # -----
+
+    def test_clean_source_requires_full_name(self) -> None:
+        """ Test that the customers_dirty3.csv cleaning drops rows without a first and last name. """
+
+        dataframe = pd.DataFrame({
+            "customer_id": [1, 2, 3, 4],
+            "full_name": ["Ahmed Ben Ali", "Tom", " ", None],
+            "email": ["ahmed.benali@example.com", "tom@example.com", "blank@example.com", "none@example.com"],
+            "signup_date": ["2025-01-01"] * 4,
+            "country": ["TN", "FR", "FR", "FR"],
+            "age": [25, 30, 35, 40],
+            "last_purchase_amount": [10.0, 20.0, 30.0, 40.0],
+            "loyalty_tier": ["GOLD"] * 4
+        })
+        result = clean_customer_source(dataframe, "customers_dirty3.csv")
+
+        assert result["customer_id"].tolist() == [1]
+        assert result.attrs["rows_deleted"] == 3
+
+        return None
@@ -0,0 +1,128 @@
+""" Tests for the per-source and merge entry points of the pipeline. """
+
+import os
+import json
+import pandas as pd
+import pytest
+from src.pipeline import main, run_pipeline
+
+RAW_FILES = ["customers_dirty.csv", "customers_dirty2.csv", "customers_dirty3.csv"]
+
+# -----
+
+class TestPipelineEntryPoints:
+    """ Tests for the command line entry points of the pipeline. """
+
+    def test_sharded_run_matches_full_run(self, workspace: str) -> None:
+        """ Test that cleaning every shard then merging gives the processed files of a full run. """
+
+        run_pipeline()
+        processed_dir = os.path.join(workspace, "data", "processed")
+        expected = [pd.read_csv(os.path.join(processed_dir, file_name.replace("dirty", "cleaned"))) for file_name in RAW_FILES]
+
+        for file_name in RAW_FILES:
+            for shard in range(2):
+                main(["--source", file_name, "--shard", str(shard), "--shards", "2"])
+        main(["--merge"])
+
+        for file_name, dataframe in zip(RAW_FILES, expected):
+            combined = pd.read_csv(os.path.join(processed_dir, file_name.replace("dirty", "cleaned")))
+
+            pd.testing.assert_frame_equal(combined, dataframe)
+
+        assert os.path.exists(os.path.join(processed_dir, "customers_golden.csv"))
+
+        return None
+
+    # -----
+
+    def test_sharded_run_drops_duplicates_across_shards(self, workspace: str) -> None:
+        """ Test that two spellings of an email repaired to the same address in two shards are de-duplicated at the merge. """
+
+        # Shards are keyed on the raw email, so this row and alice.petitexample.com land in different shards
+        with open(os.path.join(workspace, "data", "raw", "customers_dirty.csv"), "a", encoding="utf-8") as file:
+            file.write("3011,Alice Petit,alice.petit@example.com,2025-01-12,FR,35,80.00,SILVER\n")
+
+        run_pipeline(param_run_id="full")
+        processed_dir = os.path.join(workspace, "data", "processed")
+        expected = pd.read_csv(os.path.join(processed_dir, "customers_cleaned.csv"))
+
+        for shard in range(4):
+            main(["--source", "customers_dirty.csv", "--shard", str(shard), "--shards", "4"])
+        main(["--merge", "--run-id", "sharded"])
+
+        pd.testing.assert_frame_equal(pd.read_csv(os.path.join(processed_dir, "customers_cleaned.csv")), expected)
+
+        summaries = {}
+        for run_id in ["full", "sharded"]:
+            with open(os.path.join(workspace, "data", "profiles", f"{run_id}.json"), encoding="utf-8") as file:
+                summaries[run_id] = json.load(file)["sources"]["customers_cleaned.csv"]["summary"]
+
+        assert summaries["sharded"] == summaries["full"]
+
+        return None
+
+    # -----
+
+    def test_clusters_are_opt_in(self, workspace: str) -> None:
+        """ Test that near-duplicate clusters are only added with --clusters, by a full run or by the merge of shards. """
+
+        processed_path = os.path.join(workspace, "data", "processed", "customers_cleaned.csv")
+
+        main([])
+
+        assert "cluster_id" not in pd.read_csv(processed_path).columns
+
+        main(["--clusters"])
+        expected = pd.read_csv(processed_path)
+
+        assert "cluster_id" in expected.columns
+
+        for shard in range(2):
+            main(["--source", "customers_dirty.csv", "--shard", str(shard), "--shards", "2"])
+        main(["--merge", "--clusters"])
+
+        pd.testing.assert_frame_equal(pd.read_csv(processed_path), expected)
+
+        return None
+
+    # -----
+
+    def test_merge_requires_every_shard(self, workspace: str) -> None:
+        """ Test that the merge fails when a shard of a source is missing. """
+
+        main(["--source", "customers_dirty.csv", "--shard", "0", "--shards", "2"])
+
+        with pytest.raises(FileNotFoundError):
+            main(["--merge"])
+
+        return None
+
+    # -----
+
+    def test_merge_clears_parts(self, workspace: str) -> None:
+        """ Test that merged parts are removed and that parts of several shardings are not combined. """
+
+        for file_name in RAW_FILES:
+            main(["--source", file_name])
+        main(["--merge"])
+
+        assert not os.path.exists(os.path.join(workspace, "data", "processed", "parts"))
+
+        main(["--source", "customers_dirty.csv", "--shard", "0", "--shards", "2"])
+        main(["--source", "customers_dirty.csv", "--shard", "0", "--shards", "3"])
+
+        with pytest.raises(ValueError, match="several shardings"):
+            main(["--merge"])
+
+        return None
+
+    # -----
+
+    def test_invalid_shard(self, workspace: str) -> None:
+        """ Test that a shard index outside the shard count is rejected. """
+
+        with pytest.raises(ValueError):
+            main(["--source", "customers_dirty.csv", "--shard", "2", "--shards", "2"])
+
+        return None
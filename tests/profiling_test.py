@@ -0,0 +1,109 @@
+""" Tests for the source profiles and run-to-run drift detection. """
+
+import os
+import json
+import numpy as np
+import pandas as pd
+from src.clean_data import clean_customer_source
+from src.profiling import amount_quantile, compare_summaries, estimate_distinct, merge_profiles, profile_output, profile_source, record_run_profiles, summarize_profile
+
+# -----
+
+class TestProfiling:
+    """ Tests for the mergeable profile sketches. """
+
+    @staticmethod
+    def build_raw(param_rows: int, param_invalid_dates: int = 0) -> pd.DataFrame:
+        """ Build a raw customers-like dataframe with some invalid signup dates. """
+
+        return pd.DataFrame({
+            "customer_id": range(param_rows),
+            "full_name": [f"Customer Number{index}" for index in range(param_rows)],
+            "email": [f"customer{index}@example.com" for index in range(param_rows)],
+            "signup_date": ["not_a_date"] * param_invalid_dates + ["2025-01-01"] * (param_rows - param_invalid_dates),
+            "country": ["FR", "de", "IT", "ES"] * (param_rows // 4),
+            "age": [30] * param_rows,
+            "last_purchase_amount": np.arange(param_rows, dtype=float) - 1,
+            "loyalty_tier": ["GOLD", "SILVER"] * (param_rows // 2)
+        })
+
+    # -----
+
+    def test_profile_counts(self) -> None:
+        """ Test that the profile counts nulls, repairs and values of a source. """
+
+        raw = self.build_raw(40, param_invalid_dates=4)
+        profile = profile_source(raw, clean_customer_source(raw, "customers_dirty.csv"))
+
+        assert profile["rows_in"] == profile["rows_out"] == 40
+        assert profile["repairs"]["signup_date_missing"] == 4
+        assert profile["repairs"]["country_uppercased"] == 10
+        assert profile["repairs"]["last_purchase_amount_negative"] == 1
+        assert profile["histograms"]["country"] == {"FR": 10, "DE": 10, "IT": 10, "ES": 10}
+        assert round(estimate_distinct(profile["distinct"]["email"])) == 40
+
+        return None
+
+    # -----
+
+    def test_merged_chunks_match_whole_source(self) -> None:
+        """ Test that merging the profiles of two halves gives the profile of the whole. """
+
+        cleaned = clean_customer_source(self.build_raw(400), "customers_dirty.csv", param_finalize=False)
+        merged = merge_profiles(profile_output(cleaned.iloc[:150]), profile_output(cleaned.iloc[150:]))
+
+        assert merged == merge_profiles(profile_output(cleaned))
+
+        return None
+
+    # -----
+
+    def test_sketch_accuracy(self) -> None:
+        """ Test the distinct count and quantile estimates on larger data. """
+
+        amounts = pd.Series(np.random.default_rng(0).lognormal(3, 1, 100_000))
+        profile = profile_output(pd.DataFrame({"email": amounts.astype(str), "last_purchase_amount": amounts}))
+
+        assert abs(estimate_distinct(profile["distinct"]["email"]) / 100_000 - 1) < 0.05
+        for quantile in [0.5, 0.9, 0.99]:
+            assert abs(amount_quantile(profile["amount_buckets"], quantile) / amounts.quantile(quantile) - 1) < 0.02
+
+        return None
+
+    # -----
+
+    def test_compare_summaries(self) -> None:
+        """ Test that only metrics changing by the drift ratio and minimum delta are reported. """
+
+        previous = {"repair_rate.signup_date_missing": 0.05, "share.country.FR": 0.5, "null_rate.age": 0.001}
+        current = {"repair_rate.signup_date_missing": 0.1, "share.country.FR": 0.6, "null_rate.age": 0.004}
+
+        assert compare_summaries(current, previous) == [("repair_rate.signup_date_missing", 0.05, 0.1)]
+
+        return None
+
+    # -----
+
+    def test_record_run_profiles(self, tmp_path, monkeypatch) -> None:
+        """ Test that run profiles are persisted and compared with the previous run. """
+
+        monkeypatch.chdir(tmp_path)
+
+        for run_id, invalid_dates in [("run-1", 4), ("run-2", 4), ("run-3", 12)]:
+            raw = self.build_raw(40, param_invalid_dates=invalid_dates)
+            drifts = record_run_profiles(
+                {"customers_cleaned.csv": profile_source(raw, clean_customer_source(raw, "customers_dirty.csv"))},
+                run_id
+            )
+
+            if run_id == "run-2":
+                assert drifts == []
+
+        assert ("customers_cleaned.csv", "repair_rate.signup_date_missing", 0.1, 0.3) in drifts
+        assert sorted(os.listdir(tmp_path / "data" / "profiles")) == ["run-1.json", "run-2.json", "run-3.json"]
+
+        with open(tmp_path / "data" / "profiles" / "run-3.json", encoding="utf-8") as file:
+            run = json.load(file)
+        assert run["sources"]["customers_cleaned.csv"]["summary"] == summarize_profile(run["sources"]["customers_cleaned.csv"]["profile"])
+
+        return None
@@ -0,0 +1,168 @@
+""" Tests for the shared memory handoff of dataframes between pipeline stages. """
+
+import os
+import mmap
+import shutil
+import multiprocessing
+import numpy as np
+import pandas as pd
+import pytest
+from src import entity_resolution, pipeline
+from src.clean_data import clean_customer_source
+from src.pipeline import main, run_pipeline, run_pipeline_pipelined
+from src.shared_frames import SHARED_BLOCK_PREFIX, attach_dataframe, discard_handle, share_dataframe
+
+# -----
+
+def _shared_blocks() -> list:
+    """ Names of the shared memory blocks of the pipeline currently allocated. """
+
+    return [name for name in os.listdir("/dev/shm") if name.startswith(SHARED_BLOCK_PREFIX)]
+
+# -----
+
+def _attach_and_sum(param_handle: dict, param_output: multiprocessing.Queue) -> None:
+    """ Attach a shared dataframe in a child process and send back the sum of its purchase amounts. """
+
+    param_output.put(attach_dataframe(param_handle)["last_purchase_amount"].sum())
+
+    return None
+
+# -----
+
+@pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="POSIX shared memory is listed in /dev/shm")
+class TestSharedFrames:
+    """ Tests for the share_dataframe and attach_dataframe functions and the pipelined run. """
+
+    def test_round_trip(self) -> None:
+        """ Test that raw and cleaned sources are rebuilt identically, attrs included, without leaving blocks. """
+
+        raw = pd.read_csv(os.path.join("data", "raw", "customers_dirty3.csv"))
+        cleaned = clean_customer_source(raw, "customers_dirty3.csv")
+
+        for dataframe in [raw, cleaned, cleaned.iloc[:0]]:
+            shared = attach_dataframe(share_dataframe(dataframe))
+
+            pd.testing.assert_frame_equal(shared, dataframe)
+            assert shared.attrs == dataframe.attrs
+
+        assert _shared_blocks() == []
+
+        return None
+
+    # -----
+
+    def test_numeric_columns_are_not_copied(self) -> None:
+        """ Test that the NumPy columns of an attached dataframe are views on the shared memory. """
+
+        dataframe = pd.DataFrame({"customer_id": np.arange(1000), "last_purchase_amount": np.linspace(0, 1, 1000)})
+        shared = attach_dataframe(share_dataframe(dataframe))
+        base = shared["customer_id"].to_numpy()
+        while isinstance(base, np.ndarray):
+            base = base.base
+
+        assert isinstance(base, memoryview) and isinstance(base.obj, mmap.mmap)
+
+        return None
+
+    # -----
+
+    def test_attach_in_another_process(self) -> None:
+        """ Test that a dataframe shared by a process is attached by another one. """
+
+        dataframe = pd.DataFrame({"last_purchase_amount": np.arange(100, dtype=float)})
+        output = multiprocessing.Queue()
+
+        process = multiprocessing.Process(target=_attach_and_sum, args=(share_dataframe(dataframe), output))
+        process.start()
+        total = output.get(timeout=30)
+        process.join()
+
+        assert total == dataframe["last_purchase_amount"].sum()
+        assert _shared_blocks() == []
+
+        return None
+
+    # -----
+
+    def test_discard_handle(self) -> None:
+        """ Test that a handle never attached is freed. """
+
+        discard_handle(share_dataframe(pd.DataFrame({"age": [30, 40]})))
+
+        assert _shared_blocks() == []
+
+        return None
+
+    # -----
+
+    def test_pipelined_run_matches_full_run(self, workspace: str) -> None:
+        """ Test that the pipelined run cleans, saves and merges like the full run. """
+
+        expected = run_pipeline()
+        processed_dir = os.path.join(workspace, "data", "processed")
+        written = {name: open(os.path.join(processed_dir, name), "rb").read() for name in sorted(os.listdir(processed_dir)) if name.endswith(".csv")}
+
+        shutil.rmtree(processed_dir)
+        os.makedirs(processed_dir)
+
+        for dataframe, expected_dataframe in zip(run_pipeline_pipelined(), expected):
+            pd.testing.assert_frame_equal(dataframe, expected_dataframe)
+            assert dataframe.attrs == expected_dataframe.attrs
+
+        assert written == {name: open(os.path.join(processed_dir, name), "rb").read() for name in written}
+        assert _shared_blocks() == []
+
+        return None
+
+    # -----
+
+    def test_pipelined_clean_stage_starts_workers(self, workspace: str, monkeypatch) -> None:
+        """ Test that the clean stage may score duplicate candidates in its own worker processes. """
+
+        # Near-duplicates of every customer, so that each name forms a block of several rows
+        raw_path = os.path.join(workspace, "data", "raw", "customers_dirty.csv")
+        raw = pd.read_csv(raw_path)
+        pd.concat([raw, raw.assign(email=raw["email"].str.replace("@", ".alt@"))]).to_csv(raw_path, index=False)
+
+        expected = run_pipeline(param_clusters=True)
+
+        # One task per candidate pair and two CPUs, so that clustering starts a process pool
+        monkeypatch.setattr(entity_resolution, "_PAIRS_PER_TASK", 1)
+        monkeypatch.setattr(entity_resolution.os, "cpu_count", lambda: 2)
+
+        for dataframe, expected_dataframe in zip(run_pipeline_pipelined(param_clusters=True), expected):
+            pd.testing.assert_frame_equal(dataframe, expected_dataframe)
+
+        return None
+
+    # -----
+
+    def test_pipelined_run_reports_stage_failure(self, workspace: str) -> None:
+        """ Test that a failing stage fails the run with its error instead of hanging, without leaving blocks. """
+
+        os.remove(os.path.join(workspace, "data", "raw", "customers_dirty2.csv"))
+
+        with pytest.raises(RuntimeError, match="FileNotFoundError"):
+            main(["--pipelined"])
+
+        assert _shared_blocks() == []
+
+        return None
+
+    # -----
+
+    def test_pipelined_run_frees_blocks_in_flight(self, workspace: str, monkeypatch) -> None:
+        """ Test that a failing clean stage fails the run without leaving the blocks of the sources loaded after it. """
+
+        def failing_clean(param_dataframe: pd.DataFrame, param_file_name: str) -> pd.DataFrame:
+            raise ValueError(f"cannot clean {param_file_name}")
+
+        monkeypatch.setattr(pipeline, "clean_customer_source", failing_clean)
+
+        with pytest.raises(RuntimeError, match="cannot clean customers_dirty.csv"):
+            run_pipeline_pipelined()
+
+        assert _shared_blocks() == []
+
+        return None
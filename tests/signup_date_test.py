@@ -46,3 +46,18 @@ class TestFixSignupDate:
         assert pd.notna(result["signup_date"][2])
 
         return None
+
+    # -----
+
+    def test_fix_signup_date_replaces_parseable_dates(self) -> None:
+        """ Test that replacements also apply to dates that parse as valid ISO dates. """
+
+        dataframe = pd.DataFrame({"signup_date": ["2024-02-29", "2025-13-01", "2024-06-20"]})
+        replacements = {"2024-02-29": "2024-02-28", "2025-13-01": "2025-12-01"}
+        result = _fix_signup_date(dataframe, param_replacements=replacements)
+
+        assert str(result["signup_date"][0].date()) == "2024-02-28"
+        assert str(result["signup_date"][1].date()) == "2025-12-01"
+        assert str(result["signup_date"][2].date()) == "2024-06-20"
+
+        return None
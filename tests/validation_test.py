@@ -0,0 +1,127 @@
+""" Tests for the data quality validation engine. """
+
+import pandas as pd
+from src.validation import iter_processed_data, load_processed_data, validate_customers_chunks, validate_customers_data
+
+# -----
+
+class TestValidateCustomersData:
+    """ Tests for the validate_customers_data function. """
+
+    @staticmethod
+    def build_dataframe() -> pd.DataFrame:
+        """ Build a valid customers dataframe. """
+
+        return pd.DataFrame({
+            "customer_id": [1, 2, 3],
+            "full_name": ["Jean Morel", "Alice Petit", "Li Wei"],
+            "email": ["jean.morel@example.com", "alice.petit@example.com", "li.wei@example.com"],
+            "signup_date": pd.to_datetime(["2025-01-10", "2025-01-12", "2025-02-01"]),
+            "country": ["FR", "GB", "CN"],
+            "age": [42, 16, 99],
+            "last_purchase_amount": [120.5, 0.0, 10.0],
+            "loyalty_tier": ["GOLD", "SILVER", "BRONZE"]
+        })
+
+    # -----
+
+    def test_valid_dataframe(self) -> None:
+        """ Test that a clean dataframe produces an empty report. """
+
+        report = validate_customers_data(self.build_dataframe())
+
+        assert report["valid"]
+        assert report["rows"] == 3
+        assert report["invalid_rows"] == 0
+        assert not any(report["violations"].values())
+
+        return None
+
+    # -----
+
+    def test_violations_are_counted_per_rule(self) -> None:
+        """ Test that every broken constraint is reported with its count. """
+
+        dataframe = self.build_dataframe()
+        dataframe.loc[0, "age"] = 150
+        dataframe.loc[1, "email"] = "alice.petitexample.com"
+        dataframe.loc[2, "email"] = "jean.morel@example.com"
+        dataframe.loc[2, "country"] = "FRA"
+        dataframe.loc[2, "last_purchase_amount"] = -5.0
+        dataframe.loc[1, "signup_date"] = pd.NaT
+
+        report = validate_customers_data(dataframe)
+
+        assert not report["valid"]
+        assert report["violations"]["age_out_of_range"] == 1
+        assert report["violations"]["email_invalid_format"] == 1
+        assert report["violations"]["email_duplicate"] == 1
+        assert report["violations"]["country_invalid_iso"] == 1
+        assert report["violations"]["last_purchase_amount_negative"] == 1
+        assert report["violations"]["signup_date_invalid"] == 1
+        assert report["invalid_rows"] == 3
+
+        return None
+
+    # -----
+
+    def test_country_codes_are_strict_iso(self) -> None:
+        """ Test that the reserved UK code is rejected, the cleaning maps it to GB. """
+
+        dataframe = self.build_dataframe()
+        dataframe.loc[1, "country"] = "UK"
+
+        report = validate_customers_data(dataframe)
+
+        assert report["violations"]["country_invalid_iso"] == 1
+
+        return None
+
+    # -----
+
+    def test_missing_columns(self) -> None:
+        """ Test that missing required columns are reported. """
+
+        report = validate_customers_data(self.build_dataframe().drop(columns=["loyalty_tier"]))
+
+        assert not report["valid"]
+        assert report["missing_columns"] == ["loyalty_tier"]
+
+        return None
+
+    # -----
+
+    def test_load_processed_data_types(self, tmp_path) -> None:
+        """ Test that processed files are loaded with typed columns and invalid dates as NaT. """
+
+        path = tmp_path / "customers_cleaned.csv"
+        dataframe = self.build_dataframe()
+        dataframe["signup_date"] = ["2025-01-10", "not_a_date", "2025-02-01"]
+        dataframe.to_csv(path, index=False)
+
+        result = load_processed_data(str(path))
+
+        assert pd.api.types.is_datetime64_any_dtype(result["signup_date"])
+        assert result["signup_date"].isna().sum() == 1
+        assert validate_customers_data(result)["violations"]["signup_date_invalid"] == 1
+
+        return None
+
+    # -----
+
+    def test_chunked_validation_matches_full_validation(self, tmp_path) -> None:
+        """ Test that validating a file chunk by chunk finds duplicate emails across chunks. """
+
+        path = tmp_path / "customers_cleaned.csv"
+        dataframe = pd.concat([self.build_dataframe()] * 2, ignore_index=True)
+        dataframe.loc[4, "email"] = None
+        dataframe.loc[5, "age"] = 150
+        dataframe.to_csv(path, index=False)
+
+        expected = validate_customers_data(load_processed_data(str(path)))
+
+        assert expected["violations"]["email_duplicate"] == 2
+        for chunk_rows in [1, 2, 4]:
+            assert validate_customers_chunks(iter_processed_data(str(path), chunk_rows)) == expected
+
+        return None